@@ -1,113 +1,20 @@
 import streamlit as st
 import streamlit_authenticator as stauth
-import sqlite3
 import pandas as pd
-import bcrypt
+from db import conexao_leitura, conexao_escrita, versao_dados
+from migracoes import preparar_banco
+from auth import paginas_permitidas
 
 st.set_page_config(page_title="Gestor", page_icon="📊", layout="wide")
 
-DB_FILE = "gestor_mkt.db"
+# --- PREPARAÇÃO DO BANCO DE DADOS ---
+# As migrações (ver migracoes.py) rodam uma única vez por processo, não a cada reexecução.
+@st.cache_resource
+def inicializar_banco():
+    return preparar_banco(conexao_escrita())
 
-# --- FUNÇÃO DE INICIALIZAÇÃO DO BANCO DE DADOS (EXPANDIDA) ---
-def initialize_database():
-    """
-    Cria TODAS as tabelas do banco de dados se não existirem
-    e adiciona um usuário 'master' padrão se a tabela de usuários estiver vazia.
-    """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    # Tabela de usuários
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usuarios (
-            username TEXT PRIMARY KEY, name TEXT NOT NULL, password TEXT NOT NULL, role TEXT NOT NULL
-        )
-    """)
-    # Tabela de permissões
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS permissoes (
-            role TEXT NOT NULL, page_name TEXT NOT NULL, PRIMARY KEY (role, page_name)
-        )
-    """)
-    # Tabela de estoque
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS estoque (
-            codpro TEXT, produto TEXT, qtde REAL, deposito TEXT
-        )
-    """)
-    # Tabela de importações
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS imports (
-            nome TEXT, Data_prevista TEXT, CodPro TEXT, Descricao TEXT, Rolos REAL, 
-            M2 REAL, Status_fabrica TEXT, Recebido TEXT, reservado TEXT
-        )
-    """)
-    
-    # --- DEFINIÇÕES DE TABELAS COMPLETAS ---
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS clientes (
-            Codigo TEXT, Nome TEXT, Tipo_Pessoa TEXT, Email TEXT, Estado TEXT,
-            Cidade TEXT, Fone TEXT, Segmento TEXT, Vendedor TEXT, Representante TEXT,
-            Situacao TEXT, Tipo_Fiscal TEXT, Papeis TEXT, Tags TEXT
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS produtos (
-            codpro TEXT PRIMARY KEY, descricao TEXT, m2 REAL
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS vendas (
-            Data_NF TEXT, Num_NF TEXT, Codcli TEXT, Nome_do_Cliente TEXT, UF TEXT,
-            Codpro TEXT, QtdeFaturada REAL, Vlr_Unitario REAL, Valor_Total REAL,
-            Vend TEXT, Empresa TEXT
-        )
-    """)
-    # --- CORREÇÃO AQUI: Tabela de pedidos completa ---
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS pedidos (
-            Tipo TEXT, Num_Ped TEXT, Dt_Pedido TEXT, Dt_Entrega TEXT, Codcli TEXT, 
-            Nome_Cli TEXT, Codpro TEXT, Descricao_Produto TEXT, Qt_Vend REAL, 
-            Vlr_Unit REAL, Vlr_Liquido REAL, OC TEXT, Cod_Vend TEXT, Nome_Vend TEXT, 
-            Num_Ped_Web TEXT, Empresa TEXT
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS suri (
-            suri_id TEXT, telefone_suri TEXT, Numero TEXT, Documento_Identificacao TEXT,
-            Genero TEXT, Id_Canal TEXT, Tipo_Canal TEXT, Primeiro_Contato TEXT,
-            Hora_Primeiro_Contato TEXT, Ultima_Atividade TEXT, Observacao TEXT,
-            codcli TEXT, Nome TEXT, Email TEXT, Ultimo_Atendente TEXT
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS rd (
-            Email TEXT, Nome TEXT, Telefone TEXT, Celular TEXT, Empresa TEXT, 
-            Estado TEXT, Total_conversoes INTEGER, Data_primeira_conversao TEXT,
-            Origem_primeira_conversao TEXT, Data_ultima_conversao TEXT,
-            Origem_ultima_conversao TEXT, CNPJ TEXT, CodigoCliente TEXT
-        )
-    """)
-    cursor.execute("CREATE TABLE IF NOT EXISTS tag (tag_id TEXT, tag_nome TEXT)")
-    cursor.execute("CREATE TABLE IF NOT EXISTS vendedores (codvend TEXT, vendedor_nome TEXT)")
-
-    # Verifica se a tabela de usuários está vazia
-    cursor.execute("SELECT COUNT(*) FROM usuarios")
-    if cursor.fetchone()[0] == 0:
-        st.warning("Nenhum usuário encontrado. Criando usuário 'master' com senha '123'. Altere esta senha no primeiro login.")
-        hashed_password = bcrypt.hashpw('123'.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-        cursor.execute(
-            "INSERT INTO usuarios (username, name, password, role) VALUES (?, ?, ?, ?)",
-            ('master', 'Usuário Master', hashed_password, 'Master')
-        )
-
-    conn.commit()
-    conn.close()
-# --- FIM DA FUNÇÃO DE INICIALIZAÇÃO ---
-
-
-# --- CHAMA A FUNÇÃO DE INICIALIZAÇÃO NO INÍCIO DA EXECUÇÃO ---
-initialize_database()
+if inicializar_banco():
+    st.warning("Nenhum usuário encontrado. Criando usuário 'master' com senha '123'. Altere esta senha no primeiro login.")
 
 # --- O RESTANTE DO ARQUIVO CONTINUA IGUAL ---
 def show_home_page():
@@ -129,12 +36,10 @@ ALL_PAGES = {
     "11_Gerenciamento": st.Page("pages/11_Gerenciamento.py", title="Gerenciamento", icon="🔐"),
 }
 
-@st.cache_resource(ttl=300)
-def fetch_users():
+@st.cache_resource(max_entries=2)
+def fetch_users(versao):
     try:
-        conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-        df_users = pd.read_sql_query("SELECT * FROM usuarios", conn)
-        conn.close()
+        df_users = pd.read_sql_query("SELECT * FROM usuarios", conexao_leitura())
     except Exception:
         return {"usernames": {}}, {}
     credentials = {"usernames": {}}
@@ -143,32 +48,12 @@ def fetch_users():
     user_roles = pd.Series(df_users.role.values, index=df_users.username).to_dict()
     return credentials, user_roles
 
-@st.cache_data(ttl=300)
-def get_user_permissions_from_db(_role):
-    if not _role: return []
-    try:
-        conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-        df_perms = pd.read_sql_query("SELECT page_name FROM permissoes WHERE role = ?", conn, params=(_role,))
-        conn.close()
-        return df_perms['page_name'].tolist()
-    except: return []
-
-def ensure_permissions_loaded():
-    if not st.session_state.get("authentication_status"):
-        return
-    is_loaded_for_correct_user = (
-        "permissions" in st.session_state and
-        st.session_state.get("_user_for_permissions") == st.session_state.get("username")
-    )
-    if not is_loaded_for_correct_user:
-        username = st.session_state.get("username")
-        role = user_roles.get(username)
-        permissions = get_user_permissions_from_db(role)
-        st.session_state["role"] = role
-        st.session_state["permissions"] = permissions
-        st.session_state["_user_for_permissions"] = username
+def ensure_role_loaded():
+    # user_roles vem do cache versionado de usuários: alterações de perfil valem na próxima interação
+    if st.session_state.get("authentication_status"):
+        st.session_state["role"] = user_roles.get(st.session_state.get("username"))
 
-credentials, user_roles = fetch_users()
+credentials, user_roles = fetch_users(versao_dados('usuarios'))
 if not credentials or not credentials.get("usernames"):
     st.error("ERRO CRÍTICO: Nenhum usuário encontrado no banco de dados. Tente recarregar a página.")
     st.stop()
@@ -182,12 +67,13 @@ if not st.session_state.get("authentication_status"):
         st.error("Usuário ou senha incorretos.")
     st.stop()
 
-ensure_permissions_loaded()
+ensure_role_loaded()
 pages_to_show = []
 if st.session_state.get("role") == "Master":
     pages_to_show = list(ALL_PAGES.values())
 else:
-    allowed_keys = st.session_state.get("permissions", [])
+    # Mesmo resolvedor do guarda das páginas: o menu acompanha as alterações de permissões
+    allowed_keys = paginas_permitidas(st.session_state.get("role"))
     pages_to_show.append(ALL_PAGES["app"])
     for key, page in ALL_PAGES.items():
         if key in allowed_keys:
@@ -200,8 +86,7 @@ with st.sidebar:
     st.subheader(f'Bem-vindo, {st.session_state["name"]}!')
     
     if authenticator.logout("Logout", "main"):
-        st.cache_data.clear()
-        st.cache_resource.clear()
+        # Limpa apenas a sessão deste usuário; os caches compartilhados são invalidados pela versão dos dados
         for key in list(st.session_state.keys()):
             del st.session_state[key]
         st.rerun()
@@ -0,0 +1,56 @@
+import os
+import pandas as pd
+import streamlit as st
+from db import conexao_leitura, versao_dados
+
+# --- CONTROLE DE ACESSO ---
+# Guarda único das páginas: cada página chama verificar_permissao(__file__) logo no início.
+# As páginas liberadas para cada perfil ficam em cache por (perfil, versão da tabela
+# 'permissoes'); a página de Gerenciamento incrementa essa versão ao salvar, então as
+# alterações valem na próxima interação de cada usuário, sem esperar o cache expirar.
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _paginas_permitidas(role, versao):
+    if not role:
+        return []
+    try:
+        df_perms = pd.read_sql_query("SELECT page_name FROM permissoes WHERE role = ?", conexao_leitura(), params=(role,))
+    except Exception:
+        return []
+    return df_perms['page_name'].tolist()
+
+def paginas_permitidas(role):
+    """Páginas (nome do arquivo sem extensão) que o perfil pode acessar."""
+    return _paginas_permitidas(role, versao_dados('permissoes'))
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _perfil_do_usuario(username, versao):
+    linha = conexao_leitura().execute("SELECT role FROM usuarios WHERE username = ?", (username,)).fetchone()
+    return linha[0] if linha else None
+
+def perfil_do_usuario(username):
+    """Perfil (role) do usuário, ou None se ele não existir."""
+    if not username:
+        return None
+    return _perfil_do_usuario(username, versao_dados('usuarios'))
+
+def verificar_permissao(arquivo_pagina):
+    """
+    Interrompe a página se o usuário não estiver logado (voltando ao login) ou se o perfil
+    dele não tiver acesso a ela. O perfil Master acessa todas as páginas.
+    """
+    if not st.session_state.get("authentication_status"):
+        st.error("Acesso negado. Por favor, faça o login.")
+        st.switch_page("app.py")
+        st.stop()
+    role = st.session_state.get("role")
+    if not role:
+        # Sessão aberta direto na página (ex.: recarregamento): busca o perfil de novo
+        role = perfil_do_usuario(st.session_state.get("username"))
+        st.session_state["role"] = role
+    if role == "Master":
+        return
+    page_name = os.path.splitext(os.path.basename(arquivo_pagina))[0]
+    if page_name not in paginas_permitidas(role):
+        st.error("Você não tem permissão para acessar esta página.")
+        st.stop()
@@ -0,0 +1,151 @@
+import re
+import sqlite3
+import numpy as np
+import pandas as pd
+from esquema import colunas_da_tabela
+
+# --- ÍNDICE DE BUSCA TEXTUAL (FTS5) ---
+# Cada tabela pesquisável tem uma tabela virtual FTS5 'busca_<tabela>' com conteúdo externo:
+# o índice aponta para as linhas (rowid) da própria tabela e é reconstruído a cada carga,
+# dentro da mesma transação que troca as linhas (ver carga.gravar_tabela, 'na_transacao'):
+# nenhuma busca enxerga a tabela nova com o índice antigo.
+# O tokenizador ignora acentos e maiúsculas, e cada palavra pesquisada casa por prefixo.
+
+# tabela -> (coluna chave, colunas indexadas)
+INDICES_BUSCA = {
+    "clientes": ("Codigo", ["Nome", "Codigo", "Cidade", "Email"]),
+    "produtos": ("codpro", ["descricao", "codpro"]),
+    "suri": ("suri_id", ["Nome", "telefone_suri", "Numero", "Email"]),
+    "rd": ("Email", ["Nome", "Telefone", "Celular", "Email"]),
+    "pedidos": ("Num_Ped", ["Num_Ped", "Num_Ped_Web", "OC", "Codcli", "Nome_Cli", "Codpro", "Descricao_Produto", "Nome_Vend"]),
+}
+
+def _nome_indice(tabela):
+    return f"busca_{tabela}"
+
+def indice_existe(conn, tabela):
+    return bool(colunas_da_tabela(conn, _nome_indice(tabela)))
+
+def reconstruir_indice_busca(conn, tabelas=None):
+    """
+    (Re)constrói o índice de busca das tabelas informadas (ou de todas) a partir dos dados
+    atuais, sem fazer commit: usada dentro da transação da carga que troca as linhas.
+    Se a tabela não existir ou não tiver as colunas indexadas, o índice antigo é descartado.
+    Se o SQLite não tiver FTS5, nada é feito.
+    """
+    for tabela, (_, colunas) in INDICES_BUSCA.items():
+        if tabelas is not None and tabela not in tabelas:
+            continue
+        indice = _nome_indice(tabela)
+        existentes = colunas_da_tabela(conn, tabela)
+        if not existentes or not all(coluna in existentes for coluna in colunas):
+            # Um índice antigo apontaria para rowids que não correspondem mais às linhas
+            conn.execute(f"DROP TABLE IF EXISTS {indice}")
+            continue
+        try:
+            # Recria a tabela virtual para acompanhar mudanças de esquema da tabela de origem
+            conn.execute(f"DROP TABLE IF EXISTS {indice}")
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE {indice} USING fts5(
+                    {', '.join(colunas)},
+                    content='{tabela}', content_rowid='rowid',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+            conn.execute(f"INSERT INTO {indice}({indice}) VALUES ('rebuild')")
+        except sqlite3.OperationalError:
+            # SQLite sem o módulo FTS5: as páginas usam a busca por texto como alternativa
+            return
+
+def atualizar_indice_busca(conn, tabelas=None):
+    """Como reconstruir_indice_busca, em uma transação própria (migrações e tabelas sem índice)."""
+    reconstruir_indice_busca(conn, tabelas)
+    conn.commit()
+
+def migrar_indice_busca(conn):
+    """Cria o índice de busca das tabelas que não o possuem ou cujas colunas indexadas mudaram."""
+    faltantes = [tabela for tabela, (_, colunas) in INDICES_BUSCA.items()
+                 if colunas_da_tabela(conn, _nome_indice(tabela)) != colunas]
+    if faltantes:
+        atualizar_indice_busca(conn, faltantes)
+
+def consulta_fts(texto, colunas=None):
+    """
+    Converte o texto digitado em uma consulta FTS5: todas as palavras precisam aparecer,
+    cada uma casando por prefixo. Com 'colunas', as palavras só são procuradas nessas colunas
+    do índice. Retorna None se não houver palavras.
+    """
+    palavras = re.findall(r"\w+", texto or "")
+    if not palavras:
+        return None
+    consulta = " ".join(f'"{palavra}"*' for palavra in palavras)
+    return f"{{{' '.join(colunas)}}} : ({consulta})" if colunas else consulta
+
+def clausula_busca(conn, tabela, texto, colunas=None):
+    """
+    Retorna (cláusula, parâmetros) para filtrar as linhas de 'tabela' que casam com o texto,
+    no formato "rowid IN (...)". 'colunas' restringe a busca a parte das colunas indexadas.
+    Retorna None se a tabela não tiver índice de busca.
+    """
+    if tabela not in INDICES_BUSCA or not indice_existe(conn, tabela):
+        return None
+    consulta = consulta_fts(texto, colunas)
+    if consulta is None:
+        # Texto sem nenhuma palavra (ex.: só pontuação) não casa com nada
+        return "1=0", []
+    indice = _nome_indice(tabela)
+    return f"rowid IN (SELECT rowid FROM {indice} WHERE {indice} MATCH ?)", [consulta]
+
+def buscar_chaves(conn, tabela, texto, colunas=None):
+    """
+    Retorna o conjunto de chaves (ex.: Codigo dos clientes, codpro dos produtos) das linhas
+    que casam com o texto (opcionalmente só em 'colunas' do índice).
+    Retorna None se a tabela não tiver índice de busca.
+    """
+    filtro = clausula_busca(conn, tabela, texto, colunas)
+    if filtro is None:
+        return None
+    clausula, params = filtro
+    coluna_chave = INDICES_BUSCA[tabela][0]
+    linhas = conn.execute(f"SELECT DISTINCT {coluna_chave} FROM {tabela} WHERE {clausula}", params).fetchall()
+    return {str(linha[0]) for linha in linhas if linha[0] is not None}
+
+# --- PESQUISA EM MEMÓRIA (CAMPOS DE PESQUISA DAS PÁGINAS) ---
+# Cada linha ganha uma chave de busca: os valores das colunas em texto, em minúsculas e sem
+# acentos, concatenados. A chave é calculada uma vez por conjunto de dados (junto do cache
+# das páginas) e cada termo digitado vira um único teste de substring vetorizado sobre ela.
+
+SEPARADOR_CHAVE = "\x1f"  # impede que um termo case "atravessando" duas colunas
+
+def normalizar_busca(valores):
+    """Minúsculas e sem acentos, de forma vetorizada (aceita uma Series de textos)."""
+    texto = pd.Series(valores, dtype=object).astype(str).str.lower()
+    return texto.str.normalize("NFKD").str.replace(r"[\u0300-\u036f]", "", regex=True)
+
+def chave_busca(df, colunas=None):
+    """
+    Retorna a chave de busca de cada linha de 'df' (Series alinhada ao índice), a partir das
+    colunas informadas ou de todas. Os valores são convertidos com astype(str), como na tela.
+    """
+    colunas = list(df.columns) if colunas is None else colunas
+    if df.empty or not colunas:
+        return pd.Series("", index=df.index, dtype=object)
+    chave = df[colunas[0]].astype(str)
+    for coluna in colunas[1:]:
+        chave = chave + SEPARADOR_CHAVE + df[coluna].astype(str)
+    return normalizar_busca(chave)
+
+def termos_busca(texto):
+    """Separa o texto digitado em termos (por vírgula), já normalizados."""
+    termos = [termo.strip() for termo in (texto or "").split(",") if termo.strip()]
+    return normalizar_busca(termos).tolist() if termos else []
+
+def mascara_busca(chave, texto):
+    """
+    Máscara booleana das linhas cuja chave contém todos os termos do texto (separados por
+    vírgula); cada termo pode aparecer em qualquer coluna. Sem termos, todas as linhas passam.
+    """
+    mascara = np.ones(len(chave), dtype=bool)
+    for termo in termos_busca(texto):
+        mascara &= chave.str.contains(termo, regex=False).to_numpy(dtype=bool)
+    return pd.Series(mascara, index=chave.index)
@@ -0,0 +1,217 @@
+import os
+import re
+import time
+import uuid
+import pandas as pd
+from datetime import datetime
+from esquema import colunas_da_tabela
+from utils import processo_ativo
+
+# --- CARGA EM ETAPAS (STAGING) ---
+# As cargas não apagam nada antes da confirmação. O arquivo já tratado é gravado primeiro
+# em uma tabela de staging ('carga_<tabela>_<pid>_<sufixo>'), validado, e só então levado
+# para a tabela real em uma única transação (BEGIN IMMEDIATE). Os dashboards leem a versão
+# anterior dos dados até o COMMIT e nunca enxergam a tabela vazia ou pela metade.
+# Cada carga tem a sua staging: duas cargas simultâneas da mesma tabela (ex.: o app e o
+# python -m ingestao) não apagam a staging uma da outra. As stagings deixadas por processos
+# encerrados no meio de uma carga são descartadas por limpar_stagings.
+
+PREFIXO_STAGING = "carga_"
+
+def _nome_staging(tabela):
+    return f"{PREFIXO_STAGING}{tabela}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+
+def limpar_stagings(conn):
+    """
+    Descarta as stagings de processos que não estão mais rodando (as do processo atual
+    podem ser de cargas em andamento em outras threads). Retorna quantas foram descartadas.
+    """
+    nomes = [linha[0] for linha in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? ESCAPE '\\'",
+        (PREFIXO_STAGING.replace("_", "\\_") + "%",)
+    ).fetchall()]
+    descartadas = 0
+    for nome in nomes:
+        # Nomes sem pid são da staging de nome fixo das versões anteriores
+        partes = re.fullmatch(rf"{PREFIXO_STAGING}\w+_(\d+)_[0-9a-f]{{8}}", nome)
+        if partes is not None and processo_ativo(int(partes.group(1))):
+            continue
+        conn.execute(f"DROP TABLE IF EXISTS {nome}")
+        descartadas += 1
+    conn.commit()
+    return descartadas
+
+def gravar_staging(conn, tabela, df):
+    """
+    Grava o DataFrame em uma tabela de staging nova para 'tabela' e retorna o nome dela.
+    O pandas insere as linhas em lotes (executemany) dentro de uma única transação.
+    """
+    staging = _nome_staging(tabela)
+    try:
+        df.to_sql(staging, conn, index=False, chunksize=10_000)
+    except Exception:
+        conn.rollback()
+        conn.execute(f"DROP TABLE IF EXISTS {staging}")
+        conn.commit()
+        raise
+    return staging
+
+def gravar_staging_em_lotes(conn, tabela, colunas, lotes):
+    """
+    Cria a staging de 'tabela' com o esquema 'colunas' (coluna -> tipo SQL) e grava nela os
+    DataFrames do iterador 'lotes', um a um, com executemany: só um lote fica em memória por vez.
+    Cada lote é confirmado logo após ser gravado (a staging não é lida pelos dashboards), então
+    o lock de escrita não fica preso enquanto o próximo lote é lido (arquivo ou API) e outras
+    escritas podem acontecer entre os lotes. Em caso de erro, a staging é descartada.
+    Retorna (staging, linhas gravadas, segundos gastos lendo os lotes).
+    """
+    staging = _nome_staging(tabela)
+    definicoes = ", ".join(f'"{coluna}" {tipo}' for coluna, tipo in colunas.items())
+    conn.execute(f"CREATE TABLE {staging} ({definicoes})")
+    conn.commit()
+    insert = f"INSERT INTO {staging} VALUES ({', '.join('?' for _ in colunas)})"
+    linhas, segundos_leitura = 0, 0.0
+    try:
+        iterador = iter(lotes)
+        while True:
+            inicio = time.perf_counter()
+            lote = next(iterador, None)
+            segundos_leitura += time.perf_counter() - inicio
+            if lote is None:
+                break
+            lote = lote.reindex(columns=list(colunas)).astype(object)
+            conn.executemany(insert, lote.where(lote.notna(), None).itertuples(index=False, name=None))
+            conn.commit()
+            linhas += len(lote)
+    except Exception:
+        conn.rollback()
+        conn.execute(f"DROP TABLE IF EXISTS {staging}")
+        conn.commit()
+        raise
+    return staging, linhas, segundos_leitura
+
+def validar_staging(conn, staging, linhas, colunas, tabela=None, tipos=None):
+    """
+    Confere se a staging recebeu todas as linhas do arquivo e, quando a carga é mesclada
+    a uma tabela existente, se todas as colunas do arquivo existem nela (colunas com tipo
+    conhecido em 'tipos' são criadas na troca). Lança ValueError se algo não bater.
+    """
+    total = conn.execute(f"SELECT COUNT(*) FROM {staging}").fetchone()[0]
+    if total != linhas:
+        raise ValueError(f"A tabela de staging recebeu {total} linhas, mas o arquivo tem {linhas}.")
+    if tabela is not None:
+        existentes = colunas_da_tabela(conn, tabela)
+        faltantes = [coluna for coluna in colunas if coluna not in existentes and coluna not in (tipos or {})]
+        if faltantes:
+            raise ValueError(f"A tabela '{tabela}' não possui as colunas: {', '.join(faltantes)}.")
+
+def _trocar_staging(conn, tabela, staging, linhas, colunas, filtro, params, tipos=None, na_transacao=None):
+    """Valida a staging e a leva para a tabela real em uma única transação (ver gravar_tabela)."""
+    mesclar = filtro is not None and bool(colunas_da_tabela(conn, tabela))
+    try:
+        validar_staging(conn, staging, linhas, colunas, tabela if mesclar else None, tipos)
+        conn.execute("BEGIN IMMEDIATE")
+        if mesclar:
+            existentes = colunas_da_tabela(conn, tabela)
+            for coluna in colunas:
+                if coluna not in existentes:
+                    conn.execute(f'ALTER TABLE {tabela} ADD COLUMN "{coluna}" {tipos[coluna]}')
+            lista = ", ".join(f'"{coluna}"' for coluna in colunas)
+            conn.execute(f"DELETE FROM {tabela} WHERE {filtro}", params)
+            conn.execute(f"INSERT INTO {tabela} ({lista}) SELECT {lista} FROM {staging}")
+            conn.execute(f"DROP TABLE {staging}")
+        else:
+            conn.execute(f"DROP TABLE IF EXISTS {tabela}")
+            conn.execute(f"ALTER TABLE {staging} RENAME TO {tabela}")
+        if na_transacao is not None:
+            na_transacao(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        conn.execute(f"DROP TABLE IF EXISTS {staging}")
+        conn.commit()
+        raise
+
+def gravar_tabela(conn, tabela, df, filtro=None, params=(), na_transacao=None):
+    """
+    Leva o DataFrame para 'tabela' passando pela staging.
+    - Sem 'filtro': a tabela inteira é substituída (a staging é renomeada no lugar dela).
+    - Com 'filtro' (ex.: "deposito = ?"): apenas as linhas do filtro são substituídas
+      pelas do arquivo (DELETE + INSERT ... SELECT).
+    Em ambos os casos a troca acontece em uma única transação. 'na_transacao(conn)', se
+    informada, roda dentro dela, antes do COMMIT (não deve fazer commit).
+    Retorna o número de linhas gravadas.
+    """
+    staging = gravar_staging(conn, tabela, df)
+    _trocar_staging(conn, tabela, staging, len(df), list(df.columns), filtro, params, na_transacao=na_transacao)
+    return len(df)
+
+def gravar_tabela_em_lotes(conn, tabela, colunas, lotes, filtro=None, params=(), na_transacao=None):
+    """
+    Como gravar_tabela, para arquivos grandes lidos em lotes: 'lotes' é um iterador de
+    DataFrames e 'colunas' (coluna -> tipo SQL) define o esquema gravado. Na mesclagem,
+    colunas do esquema que a tabela ainda não tem são criadas. Os lotes são confirmados
+    na staging um a um (ver gravar_staging_em_lotes); só a troca é uma transação única.
+    Retorna (linhas gravadas, segundos gastos lendo os lotes).
+    """
+    staging, linhas, segundos_leitura = gravar_staging_em_lotes(conn, tabela, colunas, lotes)
+    _trocar_staging(conn, tabela, staging, linhas, list(colunas), filtro, params, colunas, na_transacao)
+    return linhas, segundos_leitura
+
+def atualizar_por_chave(conn, tabela, df, chave, na_transacao=None):
+    """
+    Upsert das linhas de 'df' em 'tabela' pela coluna 'chave': as linhas existentes com as
+    mesmas chaves são substituídas pelas do DataFrame, em uma única transação, na qual também
+    roda 'na_transacao(conn)', se informada (sem commit, como em gravar_tabela).
+    A tabela precisa já existir com as colunas do DataFrame. Retorna o número de linhas gravadas.
+    """
+    if df.empty:
+        return 0
+    colunas = list(df.columns)
+    lista = ", ".join(f'"{coluna}"' for coluna in colunas)
+    valores = df.astype(object).where(df.notna(), None)
+    chaves = [(valor,) for valor in valores[chave].unique()]
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(f'DELETE FROM {tabela} WHERE "{chave}" = ?', chaves)
+        conn.executemany(
+            f"INSERT INTO {tabela} ({lista}) VALUES ({', '.join('?' for _ in colunas)})",
+            valores.itertuples(index=False, name=None)
+        )
+        if na_transacao is not None:
+            na_transacao(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(df)
+
+# --- HISTÓRICO DE CARGAS ---
+# Cada carga confirmada registra o arquivo, o hash do conteúdo, o número de linhas e quanto
+# tempo levaram a leitura (tratamento do arquivo) e a gravação no banco.
+
+def criar_tabela_historico(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS historico_cargas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_hora TEXT, arquivo TEXT, hash_conteudo TEXT, tabela TEXT,
+            linhas INTEGER, segundos_leitura REAL, segundos_gravacao REAL
+        )
+    """)
+    conn.commit()
+
+def registrar_carga(conn, arquivo, hash_conteudo, tabela, linhas, segundos_leitura, segundos_gravacao):
+    criar_tabela_historico(conn)
+    conn.execute(
+        "INSERT INTO historico_cargas (data_hora, arquivo, hash_conteudo, tabela, linhas, segundos_leitura, segundos_gravacao) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (datetime.now().strftime('%d/%m/%Y %H:%M:%S'), arquivo, hash_conteudo, tabela, int(linhas), round(segundos_leitura, 3), round(segundos_gravacao, 3))
+    )
+    conn.commit()
+
+def historico_cargas(conn, limite=50):
+    """Últimas cargas registradas, da mais recente para a mais antiga."""
+    criar_tabela_historico(conn)
+    return pd.read_sql_query(
+        "SELECT data_hora, arquivo, tabela, linhas, segundos_leitura, segundos_gravacao FROM historico_cargas ORDER BY id DESC LIMIT ?",
+        conn, params=(limite,)
+    )
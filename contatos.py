@@ -0,0 +1,69 @@
+import pandas as pd
+
+# --- CORRESPONDÊNCIA DE CONTATOS POR TELEFONE ---
+# Em vez de procurar cada contato nas tabelas de clientes/RD, os telefones de todos
+# os contatos são "explodidos" em pares (contato, telefone) e cruzados de uma vez
+# com as tabelas de destino por meio de um merge (hash join). Para poucos contatos
+# (busca da página de Conexão), buscar_por_telefones consulta só as linhas com aqueles
+# telefones, pelo índice da coluna, em vez de ler a tabela inteira.
+
+VALORES_VAZIOS = ('', 'N/A')
+
+def telefone_como_texto(serie):
+    """
+    Telefones como texto, para cruzar colunas de tipos diferentes: o read_sql devolve colunas
+    numéricas como int ou float (5511999990000.0), e os dois lados do merge precisam ser iguais.
+    Valores vazios continuam vazios.
+    """
+    if pd.api.types.is_float_dtype(serie):
+        serie = serie.round().astype('Int64')
+    return serie.astype(str).where(serie.notna())
+
+def explodir_telefones(contatos, colunas_telefone):
+    """
+    Retorna um DataFrame com uma linha por par (contato, telefone), onde 'contato' é o
+    índice da linha em 'contatos'. Telefones vazios e repetidos no mesmo contato são descartados.
+    """
+    pares = contatos[colunas_telefone].apply(telefone_como_texto).stack().rename('telefone').reset_index(level=1, drop=True)
+    pares = pares.dropna()
+    pares = pares[~pares.isin(VALORES_VAZIOS)]
+    pares = pares.rename_axis('contato').reset_index()
+    return pares.drop_duplicates()
+
+def _alvo_por_telefone(alvo, coluna_fone):
+    """
+    Linhas do destino com telefone preenchido, numeradas pela ordem original ('_ordem') e com
+    o telefone como texto ('_fone') para o cruzamento.
+    """
+    alvo = alvo.reset_index(drop=True)
+    alvo = alvo.assign(_ordem=alvo.index, _fone=telefone_como_texto(alvo[coluna_fone]))
+    return alvo[alvo['_fone'].notna() & ~alvo['_fone'].isin(VALORES_VAZIOS)]
+
+def primeira_correspondencia(contatos, colunas_telefone, alvo, coluna_fone):
+    """
+    Para cada contato, retorna a primeira linha de 'alvo' (na ordem original da tabela)
+    cujo telefone coincide com algum dos telefones do contato.
+    O resultado é alinhado ao índice de 'contatos'; contatos sem correspondência ficam com NaN.
+    """
+    pares = explodir_telefones(contatos, colunas_telefone)
+    destino = _alvo_por_telefone(alvo, coluna_fone)
+    # Para cada telefone basta a primeira linha do destino
+    destino = destino.drop_duplicates('_fone')
+    cruzamento = pares.merge(destino, left_on='telefone', right_on='_fone', how='inner')
+    cruzamento = cruzamento.sort_values('_ordem', kind='stable').drop_duplicates('contato')
+    cruzamento = cruzamento.set_index('contato').drop(columns=['telefone', '_ordem', '_fone'])
+    return cruzamento.reindex(contatos.index)
+
+def buscar_por_telefones(conn, tabela, coluna_fone, telefones):
+    """
+    Linhas de 'tabela' cujo telefone está em 'telefones', na ordem da tabela, por uma consulta
+    parametrizada que usa o índice da coluna (idx_clientes_fone, idx_rd_celular). Colunas
+    numéricas também são encontradas: o SQLite converte os parâmetros de texto pela afinidade da coluna.
+    """
+    telefones = [telefone for telefone in dict.fromkeys(telefones) if telefone not in VALORES_VAZIOS]
+    if not telefones:
+        return pd.DataFrame()
+    return pd.read_sql_query(
+        f'SELECT * FROM {tabela} WHERE "{coluna_fone}" IN ({", ".join("?" for _ in telefones)}) ORDER BY rowid',
+        conn, params=telefones
+    )
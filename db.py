@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+
+DB_FILE = "gestor_mkt.db"
+
+# Ajustes aplicados a toda conexão aberta pelo pool
+PRAGMAS = {
+    "cache_size": -65536,       # 64 MB de cache de páginas por conexão
+    "mmap_size": 268435456,     # até 256 MB do arquivo mapeados em memória
+    "temp_store": "MEMORY",     # tabelas temporárias e ordenações em memória
+    "synchronous": "NORMAL",    # seguro em modo WAL e bem mais rápido que FULL
+    "busy_timeout": 5000,       # espera até 5s por um lock em vez de falhar na hora
+}
+
+# --- POOL DE CONEXÕES ---
+# O Streamlit roda cada reexecução de uma página em uma thread nova. Cada thread recebe do pool
+# uma conexão de leitura e uma de escrita, reaproveitadas entre as chamadas da mesma thread;
+# quando a thread termina, elas voltam ao pool e a próxima thread as reutiliza, sem reabrir o
+# arquivo nem reaplicar os PRAGMAs a cada reexecução. O pool guarda no máximo OCIOSAS_POR_TIPO
+# conexões paradas de cada tipo; as excedentes são fechadas.
+OCIOSAS_POR_TIPO = 8
+
+_pool = threading.local()
+_ociosas = {True: [], False: []}  # somente leitura? -> [(arquivo do banco, conexão)]
+_trava_ociosas = threading.Lock()
+
+def _abrir_conexao(somente_leitura):
+    if somente_leitura:
+        conn = sqlite3.connect(f"file:{DB_FILE}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(DB_FILE, check_same_thread=False, timeout=30)
+        # O modo WAL fica gravado no arquivo: leitores não bloqueiam a escrita e vice-versa
+        conn.execute("PRAGMA journal_mode = WAL")
+    for pragma, valor in PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {valor}")
+    return conn
+
+def _emprestar(somente_leitura):
+    with _trava_ociosas:
+        ociosas = _ociosas[somente_leitura]
+        while ociosas:
+            arquivo, conn = ociosas.pop()
+            if arquivo == DB_FILE:
+                return conn
+            conn.close()  # de outro banco (DB_FILE mudou, ex.: testes)
+    return _abrir_conexao(somente_leitura)
+
+def _devolver(arquivo, conn, somente_leitura):
+    try:
+        if conn.in_transaction:
+            conn.rollback()  # transação deixada aberta pela thread
+        with _trava_ociosas:
+            ociosas = _ociosas[somente_leitura]
+            if len(ociosas) < OCIOSAS_POR_TIPO:
+                ociosas.append((arquivo, conn))
+                return
+        conn.close()
+    except Exception:
+        pass  # conexão já fechada ou interpretador encerrando
+
+class _Emprestimo:
+    """Conexão emprestada a uma thread: volta ao pool quando a thread termina e o empréstimo é descartado."""
+    def __init__(self, somente_leitura):
+        self.somente_leitura = somente_leitura
+        self.arquivo = DB_FILE
+        self.conn = _emprestar(somente_leitura)
+
+    def __del__(self):
+        _devolver(self.arquivo, self.conn, self.somente_leitura)
+
+def _conexao_da_thread(atributo, somente_leitura):
+    emprestimo = getattr(_pool, atributo, None)
+    if emprestimo is None or emprestimo.arquivo != DB_FILE:
+        emprestimo = _Emprestimo(somente_leitura)
+        setattr(_pool, atributo, emprestimo)
+    return emprestimo.conn
+
+def conexao_leitura():
+    """
+    Retorna a conexão somente leitura da thread atual, usada pelos dashboards.
+    Não deve ser fechada por quem a recebe.
+    """
+    return _conexao_da_thread("leitura", somente_leitura=True)
+
+def conexao_escrita():
+    """
+    Retorna a conexão de escrita da thread atual (uploads, sincronizações, cadastros).
+    Não deve ser fechada por quem a recebe.
+    """
+    return _conexao_da_thread("escrita", somente_leitura=False)
+
+def fechar_conexoes():
+    """Fecha as conexões da thread atual e as paradas no pool (ex.: antes de trocar de banco)."""
+    for atributo in ("leitura", "escrita"):
+        emprestimo = getattr(_pool, atributo, None)
+        if emprestimo is not None:
+            delattr(_pool, atributo)  # devolve ao pool, fechado logo abaixo
+    with _trava_ociosas:
+        for ociosas in _ociosas.values():
+            for _, conn in ociosas:
+                conn.close()
+            ociosas.clear()
+
+def abrir_conexao_escrita():
+    """
+    Abre uma conexão de escrita fora do pool, para gravações que precisam ser confirmadas
+    à parte da conexão da thread (ex.: o progresso de uma tarefa em andamento).
+    Deve ser fechada por quem a abriu.
+    """
+    return _abrir_conexao(somente_leitura=False)
+
+# --- VERSÕES DOS DADOS ---
+# Cada carga incrementa a versão das tabelas que gravou. Os loaders com cache recebem
+# essas versões como parâmetro, então o cache só é refeito quando os dados mudam.
+
+def criar_tabela_versoes(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS versoes_dados (tabela TEXT PRIMARY KEY, versao INTEGER NOT NULL DEFAULT 0)")
+    conn.commit()
+
+def incrementar_versao(conn, *tabelas):
+    """Incrementa a versão das tabelas informadas (na conexão de escrita recebida)."""
+    conn.executemany(
+        "INSERT INTO versoes_dados (tabela, versao) VALUES (?, 1) ON CONFLICT(tabela) DO UPDATE SET versao = versao + 1",
+        [(tabela,) for tabela in tabelas]
+    )
+    conn.commit()
+
+def versao_dados(*tabelas):
+    """
+    Retorna uma tupla com a versão atual de cada tabela informada (0 se nunca carregada),
+    para ser usada como parte da chave dos caches.
+    """
+    marcadores = ','.join(['?'] * len(tabelas))
+    linhas = conexao_leitura().execute(f"SELECT tabela, versao FROM versoes_dados WHERE tabela IN ({marcadores})", tabelas).fetchall()
+    versoes = dict(linhas)
+    return tuple(versoes.get(tabela, 0) for tabela in tabelas)
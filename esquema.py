@@ -0,0 +1,100 @@
+from utils import chave_data
+
+# --- COLUNAS DE CHAVE DE DATA ---
+# Para cada tabela, mapeia a coluna de data em texto (dd/mm/YYYY) para a coluna
+# inteira YYYYMMDD usada nos filtros por período.
+CHAVES_DATA = {
+    "vendas": {"Data_NF": "Data_NF_chave"},
+    "pedidos": {"Dt_Pedido": "Dt_Pedido_chave", "Dt_Entrega": "Dt_Entrega_chave"},
+    "imports": {"Data_prevista": "Data_prevista_chave"},
+    "suri": {"Primeiro_Contato": "Primeiro_Contato_chave", "Ultima_Atividade": "Ultima_Atividade_chave"},
+    "rd": {"Data_primeira_conversao": "Data_primeira_conversao_chave", "Data_ultima_conversao": "Data_ultima_conversao_chave"},
+}
+
+def colunas_da_tabela(conn, tabela):
+    """Retorna a lista de colunas de uma tabela (vazia se a tabela não existir)."""
+    return [linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})").fetchall()]
+
+def adicionar_chaves_data(df, tabela):
+    """
+    Preenche no DataFrame as colunas de chave de data da tabela,
+    a partir das colunas de data em texto que estiverem presentes.
+    """
+    for coluna_texto, coluna_chave in CHAVES_DATA.get(tabela, {}).items():
+        if coluna_texto in df.columns:
+            df[coluna_chave] = chave_data(df[coluna_texto])
+    return df
+
+def migrar_chaves_data(conn):
+    """
+    Adiciona as colunas de chave de data que ainda não existem no banco e as
+    preenche a partir das datas em texto já gravadas.
+    Só faz trabalho quando a coluna é criada; as cargas seguintes já gravam a chave.
+    """
+    for tabela, colunas in CHAVES_DATA.items():
+        existentes = colunas_da_tabela(conn, tabela)
+        if not existentes:
+            continue
+        for coluna_texto, coluna_chave in colunas.items():
+            if coluna_chave in existentes or coluna_texto not in existentes:
+                continue
+            conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna_chave} INTEGER")
+            conn.execute(f"""
+                UPDATE {tabela}
+                SET {coluna_chave} = CAST(substr({coluna_texto}, 7, 4) || substr({coluna_texto}, 4, 2) || substr({coluna_texto}, 1, 2) AS INTEGER)
+                WHERE {coluna_texto} LIKE '__/__/____'
+            """)
+    conn.commit()
+
+# --- ÍNDICES GERENCIADOS ---
+# Recriados após cada carga, pois o to_sql(if_exists='replace') descarta os índices da tabela.
+INDICES = [
+    ("idx_vendas_empresa_data_vend", "vendas", ["Empresa", "Data_NF_chave", "Vend"]),
+    ("idx_vendas_data", "vendas", ["Data_NF_chave"]),
+    ("idx_vendas_codcli", "vendas", ["Codcli"]),
+    ("idx_pedidos_empresa_data_vend_tipo", "pedidos", ["Empresa", "Dt_Entrega_chave", "Cod_Vend", "Tipo"]),
+    ("idx_pedidos_data", "pedidos", ["Dt_Entrega_chave"]),
+    ("idx_pedidos_codcli", "pedidos", ["Codcli"]),
+    ("idx_clientes_codigo", "clientes", ["Codigo"]),
+    ("idx_clientes_fone", "clientes", ["Fone"]),
+    ("idx_produtos_codpro", "produtos", ["codpro"]),
+    ("idx_vendedores_codvend", "vendedores", ["codvend"]),
+    ("idx_rd_celular", "rd", ["Celular"]),
+    ("idx_rd_codigocliente", "rd", ["CodigoCliente"]),
+    ("idx_suri_codcli", "suri", ["codcli"]),
+    ("idx_suri_numero", "suri", ["Numero"]),
+    ("idx_suri_id", "suri", ["suri_id"]),
+    ("idx_estoque_codpro_deposito", "estoque", ["codpro", "deposito"]),
+]
+
+def aplicar_indices(conn, tabelas=None):
+    """
+    Cria os índices gerenciados que ainda não existem.
+    Se 'tabelas' for informado, considera apenas os índices dessas tabelas.
+    Índices cujas colunas não existem na tabela são ignorados.
+    """
+    for nome, tabela, colunas in INDICES:
+        if tabelas is not None and tabela not in tabelas:
+            continue
+        existentes = colunas_da_tabela(conn, tabela)
+        if not existentes or not all(coluna in existentes for coluna in colunas):
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({', '.join(colunas)})")
+    # Atualiza as estatísticas usadas pelo planejador de consultas
+    conn.execute("PRAGMA optimize")
+    conn.commit()
+
+def adicionar_colunas(conn, tabela, colunas):
+    """
+    Cria na tabela as colunas de 'colunas' (coluna -> tipo SQL) que ainda não existem.
+    Corrige tabelas recriadas por uma carga sem alguma coluna esperada pelas páginas.
+    Tabelas que não existem são ignoradas. Retorna as colunas criadas.
+    """
+    existentes = colunas_da_tabela(conn, tabela)
+    if not existentes:
+        return []
+    faltantes = [coluna for coluna in colunas if coluna not in existentes]
+    for coluna in faltantes:
+        conn.execute(f'ALTER TABLE {tabela} ADD COLUMN "{coluna}" {colunas[coluna]}')
+    conn.commit()
+    return faltantes
@@ -0,0 +1,25 @@
+import streamlit as st
+
+# --- EXIBIÇÃO DE TABELAS ---
+# Tabelas numéricas grandes (Vendas, Pedidos, Estoque, Importações, Saldos) são enviadas ao
+# st.dataframe sem pandas Styler: o Styler formata cada célula com uma função Python e serializa
+# a tabela inteira a cada reexecução, enquanto a grade do st.dataframe só desenha as linhas visíveis.
+# As colunas numéricas continuam numéricas (a ordenação pelo cabeçalho da grade, a cópia e a
+# exportação usam os números) e a própria grade as formata com um formato printf: o "'." troca o
+# separador de milhares por ponto, no padrão brasileiro (1.234 e "R$ 1.234"). Os valores são
+# exibidos em inteiros, já que o separador decimal do formato continua sendo o ponto.
+
+def formato_numero(moeda=False):
+    """Formato do st.column_config.NumberColumn: inteiro com milhares separados por ponto."""
+    return ("R$ " if moeda else "") + "%'.,.0f"
+
+def mostrar_tabela(df, colunas_numericas, moeda=False, column_config=None):
+    """
+    Exibe 'df' com as 'colunas_numericas' formatadas pela grade (ver formato_numero).
+    'column_config' acrescenta configurações de outras colunas (ex.: largura da coluna de nomes).
+    """
+    config = {
+        coluna: st.column_config.NumberColumn(format=formato_numero(moeda))
+        for coluna in colunas_numericas if coluna in df.columns
+    }
+    st.dataframe(df, width='stretch', hide_index=True, column_config={**config, **(column_config or {})})
@@ -0,0 +1,6 @@
+# --- INGESTÃO DOS ARQUIVOS ---
+# Leitura (leitores.py) e gravação (gravacao.py) dos arquivos exportados dos sistemas, usadas
+# pela página de Uploads, pela carga em lote de uma pasta inteira (python -m ingestao <pasta>)
+# e pelo observador que recarrega só os arquivos alterados (python -m ingestao <pasta> --observar).
+# Os módulos são importados diretamente (ex.: from ingestao.leitores import ler_arquivo), para
+# que importar os leitores não carregue a gravação e as migrações junto.
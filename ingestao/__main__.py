@@ -0,0 +1,25 @@
+import argparse
+import time
+from db import conexao_escrita
+from migracoes import preparar_banco
+from ingestao.lote import carregar_pasta
+from ingestao.observador import INTERVALO_PADRAO, observar
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m ingestao", description="Carrega no banco todos os arquivos reconhecidos de uma pasta.")
+    parser.add_argument("pasta", help="pasta com os arquivos exportados (ex.: dados/)")
+    parser.add_argument("--processos", type=int, default=None, help="número de processos de leitura (padrão: um por CPU)")
+    parser.add_argument("--observar", action="store_true", help="continua rodando e carrega apenas os arquivos que mudarem")
+    parser.add_argument("--intervalo", type=int, default=INTERVALO_PADRAO, help=f"segundos entre as verificações da pasta (padrão: {INTERVALO_PADRAO})")
+    args = parser.parse_args()
+    # Banco novo ou de uma versão anterior: aplica as migrações antes de carregar
+    preparar_banco(conexao_escrita())
+    if args.observar:
+        observar(args.pasta, args.intervalo, args.processos)
+        return
+    inicio = time.perf_counter()
+    gravados = carregar_pasta(args.pasta, args.processos)
+    print(f"{len(gravados)} arquivo(s) carregado(s) em {time.perf_counter() - inicio:.2f}s")
+
+if __name__ == "__main__":
+    main()
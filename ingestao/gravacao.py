@@ -0,0 +1,111 @@
+import io
+import time
+from datetime import datetime
+from migracoes import corrigir_esquema
+from db import incrementar_versao
+from resumos import atualizar_resumo_vendas, atualizar_resumo_estoque
+from unidades import atualizar_rolos
+from busca import INDICES_BUSCA, indice_existe, atualizar_indice_busca, reconstruir_indice_busca
+from carga import gravar_tabela, gravar_tabela_em_lotes, registrar_carga
+from suri_api import criar_tabela_sincronizacoes, limpar_marca
+from ingestao.leitores import (
+    COLUNAS_VENDAS, tipo_do_arquivo, deposito_do_arquivo, empresa_do_arquivo, ler_vendas_em_lotes
+)
+
+# --- GRAVAÇÃO DAS CARGAS ---
+# O que cada tipo de arquivo faz ao ser confirmado: grava a tabela (via staging, ver carga.py)
+# e refaz o que depende dela (índices, busca textual, resumos, rolos e versões dos caches).
+
+# tipo de arquivo -> tabela gravada
+TABELAS_POR_TIPO = {
+    "imports": "imports",
+    "estoque": "estoque",
+    "vendas_mes": "vendas",
+    "historico_vendas": "vendas",
+    "produtos": "produtos",
+    "clientes": "clientes",
+    "pedidos": "pedidos",
+    "suri": "suri",
+    "rd": "rd",
+}
+
+# Ordem de gravação na carga em lote: os produtos vêm primeiro porque o m2 deles é usado
+# para calcular os rolos de estoque e pedidos e o resumo de vendas.
+ORDEM_CARGA = ["produtos", "clientes", "estoque", "pedidos", "imports", "historico_vendas", "vendas_mes", "suri", "rd"]
+
+def chaves_mes_atual():
+    """Intervalo (YYYYMMDD) do mês atual, substituído pela carga do 'vendas.txt'."""
+    hoje = datetime.now()
+    return hoje.year * 10000 + hoje.month * 100 + 1, hoje.year * 10000 + hoje.month * 100 + 31
+
+def gravar_arquivo(conn, nome, df, hash_conteudo=None, segundos_leitura=0.0):
+    """
+    Grava o DataFrame já lido do arquivo 'nome' e refaz o que depende da tabela.
+    Não serve para as vendas, gravadas em lotes por gravar_vendas. Retorna o número de linhas.
+    """
+    tipo = tipo_do_arquivo(nome)
+    tabela = TABELAS_POR_TIPO.get(tipo)
+    if tabela is None or tabela == "vendas":
+        raise ValueError(f"Arquivo não suportado por gravar_arquivo: '{nome}'.")
+
+    def na_transacao(conn):
+        # O índice de busca é refeito na mesma transação que troca as linhas
+        reconstruir_indice_busca(conn, [tabela])
+        if tipo == "suri":
+            # O arquivo substitui os contatos da API: a marca d'água cai junto
+            limpar_marca(conn)
+
+    inicio = time.perf_counter()
+    if tipo == "suri":
+        criar_tabela_sincronizacoes(conn)
+    if tipo == "estoque":
+        # Substitui o estoque do depósito em uma única transação
+        gravar_tabela(conn, 'estoque', df, "deposito = ?", (deposito_do_arquivo(nome),), na_transacao)
+    elif tipo == "pedidos":
+        # Substitui os pedidos da empresa em uma única transação
+        gravar_tabela(conn, 'pedidos', df, "Empresa = ?", (empresa_do_arquivo(nome),), na_transacao)
+    else:
+        gravar_tabela(conn, tabela, df, na_transacao=na_transacao)
+    corrigir_esquema(conn, [tabela])
+    if tabela in INDICES_BUSCA and not indice_existe(conn, tabela):
+        # O arquivo não trazia alguma coluna indexada, criada agora pela correção do esquema
+        atualizar_indice_busca(conn, [tabela])
+    if tipo == "estoque":
+        atualizar_resumo_estoque(conn, deposito_do_arquivo(nome))
+    incrementar_versao(conn, tabela)
+    if tipo == "produtos":
+        # Os rolos do resumo de vendas, dos pedidos e do estoque dependem do m2 dos produtos
+        atualizar_resumo_vendas(conn)
+        atualizar_rolos(conn)
+        atualizar_resumo_estoque(conn)
+        incrementar_versao(conn, 'pedidos', 'estoque')
+    registrar_carga(conn, nome, hash_conteudo, tabela, len(df), segundos_leitura, time.perf_counter() - inicio)
+    return len(df)
+
+def gravar_vendas(conn, arquivos, hash_conteudo=None):
+    """
+    Grava as vendas lendo os arquivos em lotes. 'arquivos' é uma lista de pares (nome, conteúdo),
+    onde o conteúdo é um caminho ou bytes. Um 'vendas.txt' substitui apenas o mês atual; os
+    históricos 'lucratividade*' substituem a tabela inteira (vários históricos formam uma única carga).
+    Retorna (linhas, segundos de leitura, segundos de gravação).
+    """
+    nomes = [nome for nome, _ in arquivos]
+    mes_atual = all(tipo_do_arquivo(nome) == "vendas_mes" for nome in nomes)
+    filtro, params = ("Data_NF_chave BETWEEN ? AND ?", chaves_mes_atual()) if mes_atual else (None, ())
+
+    def lotes():
+        for _, conteudo in arquivos:
+            yield from ler_vendas_em_lotes(io.BytesIO(conteudo) if isinstance(conteudo, bytes) else conteudo)
+
+    inicio = time.perf_counter()
+    linhas, segundos_leitura = gravar_tabela_em_lotes(conn, 'vendas', COLUNAS_VENDAS, lotes(), filtro, params)
+    corrigir_esquema(conn, ['vendas'])
+    incrementar_versao(conn, 'vendas')
+    # Refaz apenas o mês atual no resumo mensal, ou o resumo inteiro após um histórico
+    if mes_atual:
+        atualizar_resumo_vendas(conn, *params)
+    else:
+        atualizar_resumo_vendas(conn)
+    segundos_gravacao = time.perf_counter() - inicio - segundos_leitura
+    registrar_carga(conn, ", ".join(nomes), hash_conteudo, 'vendas', linhas, segundos_leitura, segundos_gravacao)
+    return linhas, segundos_leitura, segundos_gravacao
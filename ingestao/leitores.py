@@ -0,0 +1,193 @@
+import pandas as pd
+from utils import padronizar_telefones, formatar_data
+from esquema import adicionar_chaves_data
+from unidades import rolos_por_produto
+
+# --- LEITORES DOS ARQUIVOS ---
+# Cada função recebe o arquivo (caminho ou objeto de arquivo) e devolve o DataFrame já tratado,
+# pronto para gravar. São usados pela página de Uploads e pela carga em lote (python -m ingestao).
+# Ao alterar qualquer leitor, incremente VERSAO_LEITORES para descartar as prévias em cache.
+VERSAO_LEITORES = 2
+
+def separar_cod_e_nome(nome_completo):
+    if isinstance(nome_completo, str) and '|' in nome_completo:
+        partes = nome_completo.split('|', 1); return partes[0].strip(), partes[1].strip()
+    else:
+        nome_original = "" if pd.isna(nome_completo) else str(nome_completo); return "0", nome_original.strip()
+
+def ler_imports(arquivo):
+    df = pd.read_excel(arquivo, dtype=str, sheet_name="import")
+    df.columns = df.columns.str.strip()
+
+    # Adicionada a coluna 'reservado'
+    colunas_esperadas = ['nome', 'Data_prevista', 'CodPro', 'Descricao', 'Rolos', 'M2', 'Status_fabrica', 'Recebido', 'reservado']
+    df = df.reindex(columns=colunas_esperadas)
+
+    df['CodPro'] = df['CodPro'].str.lstrip('0')
+    df['Data_prevista'] = pd.to_datetime(df['Data_prevista'], errors='coerce').dt.strftime('%d/%m/%Y')
+    adicionar_chaves_data(df, 'imports')
+    df['Rolos'] = pd.to_numeric(df['Rolos'], errors='coerce').fillna(0)
+    df['M2'] = pd.to_numeric(df['M2'], errors='coerce').fillna(0)
+    return df
+
+def ler_estoque(arquivo, deposito):
+    df = pd.read_csv(arquivo, header=None, skiprows=2, encoding='latin-1', skip_blank_lines=True, sep='\t')
+    if df.empty:
+        raise ValueError("O arquivo de estoque está vazio ou em formato não reconhecido.")
+    df.rename(columns={0: 'raw'}, inplace=True)
+    df.dropna(subset=['raw'], inplace=True)
+    df = df[~df['raw'].str.contains('TOTAL GERAL', na=False)]
+    df['codpro'] = df['raw'].str.slice(18, 24).str.strip()
+    df['produto'] = df['raw'].str.slice(25, 75).str.strip()
+    df['qtde'] = df['raw'].str.slice(79, 90).str.strip()
+    df = df[['codpro', 'produto', 'qtde']]
+    df = df.dropna(subset=['codpro'])
+    df = df[df['codpro'] != '']
+    df['deposito'] = deposito
+    df['codpro'] = df['codpro'].str.lstrip('0')
+    df['qtde'] = pd.to_numeric(df['qtde'].str.replace('.', '', regex=False).str.replace(',', '.', regex=False), errors='coerce').fillna(0).astype(int)
+    df['rolos'] = rolos_por_produto(df['qtde'], df['codpro'])
+    return df
+
+# Esquema gravado na tabela 'vendas'. Além das colunas usadas pelos dashboards, guarda os
+# códigos analíticos do arquivo (CFOP, representante, classificação e referência do produto)
+# em forma compacta: só os códigos, sem as descrições repetidas em cada linha.
+COLUNAS_VENDAS = {
+    'Data_NF': 'TEXT', 'Num_NF': 'TEXT', 'Codcli': 'TEXT', 'Nome_do_Cliente': 'TEXT', 'UF': 'TEXT',
+    'Codpro': 'TEXT', 'QtdeFaturada': 'REAL', 'Vlr_Unitario': 'REAL', 'Valor_Total': 'REAL',
+    'Vend': 'TEXT', 'Empresa': 'TEXT', 'Data_NF_chave': 'INTEGER',
+    'CFOP': 'INTEGER', 'Repr': 'TEXT', 'Cla': 'INTEGER', 'SCl': 'INTEGER', 'Referencia': 'TEXT',
+}
+COLUNAS_OPCIONAIS_VENDAS = ['CFOP', 'Repr', 'Cla', 'SCl', 'Referencia']
+LINHAS_POR_LOTE_VENDAS = 50_000
+
+def ler_vendas_em_lotes(arquivo, linhas_por_lote=LINHAS_POR_LOTE_VENDAS):
+    """
+    Leitor comum ao 'vendas.txt' (mês atual) e aos históricos 'lucratividade*'.
+    Lê o arquivo em lotes, apenas com as colunas gravadas e com os números já convertidos
+    pelo próprio leitor de CSV (decimal ',' e milhar '.'), e devolve cada lote tratado.
+    """
+    # Os nomes no cabeçalho vêm com espaços à direita ("Data_NF   ")
+    cabecalho = pd.read_csv(arquivo, encoding='latin-1', sep=';', skipinitialspace=True, nrows=0).columns
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    nomes = {bruto: bruto.strip() for bruto in cabecalho}
+    usadas = [bruto for bruto, nome in nomes.items() if nome in COLUNAS_VENDAS]
+    faltantes = [c for c in COLUNAS_VENDAS if c != 'Data_NF_chave' and c not in COLUNAS_OPCIONAIS_VENDAS and c not in nomes.values()]
+    if faltantes:
+        raise ValueError(f"Colunas ausentes no arquivo: {', '.join(faltantes)}.")
+    tipos = {bruto: ('float64' if COLUNAS_VENDAS[nomes[bruto]] == 'REAL' else str) for bruto in usadas}
+    leitor = pd.read_csv(
+        arquivo, encoding='latin-1', sep=';', skipinitialspace=True, usecols=usadas, dtype=tipos,
+        decimal=',', thousands='.', chunksize=linhas_por_lote
+    )
+    for df in leitor:
+        df = df.rename(columns=nomes)
+        df['Data_NF'] = formatar_data(df['Data_NF'].str.strip())
+        adicionar_chaves_data(df, 'vendas')
+        for col in ['Codcli', 'Codpro', 'Num_NF', 'Vend', 'Repr', 'Empresa']:
+            if col in df.columns:
+                df[col] = df[col].str.strip().str.lstrip('0')
+        for col in ['CFOP', 'Cla', 'SCl']:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+        if 'Referencia' in df.columns:
+            df['Referencia'] = df['Referencia'].str.strip()
+        yield df.reindex(columns=list(COLUNAS_VENDAS))
+
+def ler_vendas(arquivo):
+    """Prévia das vendas: apenas o primeiro lote do arquivo (a carga é feita em lotes)."""
+    return next(ler_vendas_em_lotes(arquivo), pd.DataFrame(columns=list(COLUNAS_VENDAS)))
+
+def ler_produtos(arquivo):
+    df = pd.read_csv(arquivo, encoding='latin-1', sep=';', dtype=str)
+    df.columns = df.columns.str.strip()
+    if 'codpro' in df.columns: df['codpro'] = df['codpro'].str.lstrip('0')
+    if 'm2' in df.columns:
+        df['m2'] = df['m2'].str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        df['m2'] = pd.to_numeric(df['m2'], errors='coerce')
+    return df
+
+def ler_clientes(arquivo, conn, telefones_novos=None):
+    df = pd.read_csv(arquivo, encoding='utf-8-sig', sep=';', header=0, names=['Codigo', 'Nome', 'Tipo_Pessoa', 'Email', 'Estado', 'Cidade', 'Fone', 'Segmento', 'Vendedor', 'Representante', 'Situacao', 'Tipo_Fiscal', 'Papeis', 'Tags'])
+    df['Fone'] = padronizar_telefones(df['Fone'].astype(str), conn, telefones_novos)
+    df['Codigo'] = df['Codigo'].astype(str).str.lstrip('0')
+    return df
+
+def ler_pedidos(arquivo, empresa_id):
+    df = pd.read_excel(arquivo)
+    mapa_colunas = {
+        'PEDVENDCAB_tipo': 'Tipo', 'PEDVENDCAB_numped': 'Num_Ped', 'PEDVENDCAB_dtpedido': 'Dt_Pedido', 'PEDVENDCAB_dtentrega': 'Dt_Entrega',
+        'PEDVENDCAB_codcli': 'Codcli', 'PEDVENDCAB_nomecli': 'Nome_Cli', 'PEDVENDITE_codpro': 'Codpro', 'PEDVENDITE_descricao': 'Descricao_Produto',
+        'PEDVENDITE_qtvend': 'Qt_Vend', 'PEDVENDITE_vlunit': 'Vlr_Unit', 'PEDVENDITE_vlliquido': 'Vlr_Liquido', 'PEDVENDITE_ocompra': 'OC',
+        'PEDVENDITE_vendedor': 'Cod_Vend', 'TBVEND_nome': 'Nome_Vend', 'PEDVENDCAB_numpedweb': 'Num_Ped_Web', 'PEDVENDCAB_empresa': 'Empresa'
+    }
+    df = df.rename(columns=mapa_colunas)
+    df['Empresa'] = empresa_id
+    df['Dt_Pedido'] = formatar_data(df['Dt_Pedido'])
+    df['Dt_Entrega'] = formatar_data(df['Dt_Entrega'])
+    adicionar_chaves_data(df, 'pedidos')
+    for col in ['Num_Ped', 'Codcli', 'Codpro', 'Cod_Vend']:
+        if col in df.columns: df[col] = df[col].astype(str).str.lstrip('0')
+    df['Rolos'] = rolos_por_produto(df['Qt_Vend'], df['Codpro'])
+    return df
+
+def ler_suri(arquivo, conn, telefones_novos=None):
+    df = pd.read_excel(arquivo)
+    df.columns = df.columns.str.strip()
+    mapa_nomes = {'Número': 'Numero', 'Documento de Identificação': 'Documento_Identificacao', 'Gênero': 'Genero', 'Id do Canal': 'Id_Canal', 'Tipo do Canal': 'Tipo_Canal', 'Primeiro Contato': 'Primeiro_Contato', 'Observação': 'Observacao'}
+    df = df.rename(columns=mapa_nomes)
+    df[['codcli', 'Nome']] = df['Nome'].apply(lambda x: pd.Series(separar_cod_e_nome(x)))
+    df['codcli'] = df['codcli'].astype(str)
+    df['Numero'] = padronizar_telefones(df['Numero'].astype(str), conn, telefones_novos)
+    df['Primeiro_Contato'] = formatar_data(df['Primeiro_Contato'])
+    adicionar_chaves_data(df, 'suri')
+    return df
+
+def ler_rd(arquivo, conn, telefones_novos=None):
+    nomes_colunas_rd = ['Email', 'Nome', 'Telefone', 'Celular', 'Empresa', 'Estado', 'Total_conversoes', 'Data_primeira_conversao', 'Origem_primeira_conversao', 'Data_ultima_conversao', 'Origem_ultima_conversao', 'CNPJ', 'CodigoCliente']
+    df = pd.read_csv(arquivo, encoding='latin-1', sep=';', header=0, names=nomes_colunas_rd)
+    df['Telefone'] = padronizar_telefones(df['Telefone'].astype(str), conn, telefones_novos)
+    df['Celular'] = padronizar_telefones(df['Celular'].astype(str), conn, telefones_novos)
+    df['Data_primeira_conversao'] = formatar_data(df['Data_primeira_conversao'])
+    df['Data_ultima_conversao'] = formatar_data(df['Data_ultima_conversao'])
+    adicionar_chaves_data(df, 'rd')
+    return df
+
+# --- IDENTIFICAÇÃO DOS ARQUIVOS ---
+def tipo_do_arquivo(nome):
+    """Tipo de carga do arquivo pelo nome (ex.: 'estoque', 'historico_vendas'), ou None se não for reconhecido."""
+    if nome == "imports.xlsx": return "imports"
+    if nome in ["hub1.txt", "hub3.txt", "hub19.txt"]: return "estoque"
+    if nome == "vendas.txt": return "vendas_mes"
+    if nome.startswith("lucratividade"): return "historico_vendas"
+    if nome == "produtos.csv": return "produtos"
+    if nome == "clientes.csv": return "clientes"
+    if nome in ["pedidos_cd.xls", "pedidos_loja.xls"]: return "pedidos"
+    if nome == "suri.xlsx": return "suri"
+    if nome == "RD.csv": return "rd"
+    return None
+
+def deposito_do_arquivo(nome):
+    return nome.split('.')[0]
+
+def empresa_do_arquivo(nome):
+    return '1' if nome == "pedidos_cd.xls" else '3'
+
+def ler_arquivo(arquivo, nome, conn=None, telefones_novos=None):
+    """
+    Lê e trata o arquivo conforme o nome, devolvendo o DataFrame pronto para gravar.
+    Para as vendas, que são gravadas em lotes, devolve apenas o primeiro lote (prévia).
+    'conn' é usada pelo cache de telefones normalizados (clientes, suri e RD). Com
+    'telefones_novos' (dict), o cache só é consultado e os telefones novos ficam no dict.
+    """
+    tipo = tipo_do_arquivo(nome)
+    if tipo == "imports": return ler_imports(arquivo)
+    if tipo == "estoque": return ler_estoque(arquivo, deposito_do_arquivo(nome))
+    if tipo in ("vendas_mes", "historico_vendas"): return ler_vendas(arquivo)
+    if tipo == "produtos": return ler_produtos(arquivo)
+    if tipo == "clientes": return ler_clientes(arquivo, conn, telefones_novos)
+    if tipo == "pedidos": return ler_pedidos(arquivo, empresa_do_arquivo(nome))
+    if tipo == "suri": return ler_suri(arquivo, conn, telefones_novos)
+    if tipo == "rd": return ler_rd(arquivo, conn, telefones_novos)
+    raise ValueError(f"Arquivo não reconhecido: '{nome}'.")
@@ -0,0 +1,125 @@
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from db import conexao_leitura, conexao_escrita
+from ingestao.leitores import tipo_do_arquivo, ler_arquivo
+from ingestao.gravacao import ORDEM_CARGA, gravar_arquivo, gravar_vendas
+from utils import criar_tabela_telefones, gravar_telefones_normalizados
+
+# --- CARGA EM LOTE DE UMA PASTA ---
+# Uso (a partir da pasta do app, onde fica o gestor_mkt.db):
+#     python -m ingestao dados/
+# Os arquivos reconhecidos são lidos em paralelo, um processo por arquivo, e gravados em
+# sequência na ordem de ORDEM_CARGA. Os produtos são gravados antes de tudo, pois a leitura
+# do estoque calcula os rolos a partir do m2 deles. Os históricos 'lucratividade*' são lidos
+# em lotes durante a gravação e formam uma única carga da tabela de vendas.
+# Os processos de leitura não gravam no banco: consultam o cache de telefones com uma conexão
+# somente leitura e devolvem os telefones novos, gravados pelo processo principal.
+
+TIPOS_VENDAS = ("historico_vendas", "vendas_mes")
+
+def _megabytes(caminho):
+    return os.path.getsize(caminho) / 1_048_576
+
+def hash_arquivo(caminho):
+    hash_conteudo = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1_048_576), b""):
+            hash_conteudo.update(bloco)
+    return hash_conteudo.hexdigest()
+
+def ler_em_processo(caminho):
+    """
+    Lê o arquivo em um processo separado, sem gravar no banco.
+    Retorna (df, hash do conteúdo, segundos de leitura, telefones novos para o cache).
+    """
+    inicio = time.perf_counter()
+    telefones_novos = {}
+    df = ler_arquivo(caminho, os.path.basename(caminho), conexao_leitura(), telefones_novos)
+    return df, hash_arquivo(caminho), time.perf_counter() - inicio, telefones_novos
+
+def imprimir_resultado(nome, linhas, segundos_leitura, segundos_gravacao, megabytes):
+    total = segundos_leitura + segundos_gravacao
+    linhas_por_segundo = linhas / total if total else 0
+    mb_por_segundo = megabytes / total if total else 0
+    print(f"{nome:<32} {linhas:>10,} linhas  leitura {segundos_leitura:7.2f}s  gravação {segundos_gravacao:7.2f}s"
+          f"  {linhas_por_segundo:>10,.0f} linhas/s  {mb_por_segundo:6.1f} MB/s")
+
+def arquivos_da_pasta(pasta, avisar=True):
+    """Caminhos dos arquivos reconhecidos da pasta, em ordem alfabética."""
+    caminhos = []
+    for nome in sorted(os.listdir(pasta)):
+        caminho = os.path.join(pasta, nome)
+        if os.path.isfile(caminho) and tipo_do_arquivo(nome) is not None:
+            caminhos.append(caminho)
+        elif avisar:
+            print(f"{nome:<32} ignorado (arquivo não reconhecido)")
+    return caminhos
+
+def _gravar_lido(conn, caminho, leitura):
+    """Grava um arquivo já lido (leitura = retorno de ler_em_processo) e imprime o resultado."""
+    nome = os.path.basename(caminho)
+    df, hash_conteudo, segundos_leitura, telefones_novos = leitura
+    inicio = time.perf_counter()
+    gravar_telefones_normalizados(conn, telefones_novos)
+    linhas = gravar_arquivo(conn, nome, df, hash_conteudo, segundos_leitura)
+    imprimir_resultado(nome, linhas, segundos_leitura, time.perf_counter() - inicio, _megabytes(caminho))
+
+def carregar_arquivos(caminhos, processos=None):
+    """
+    Lê e grava os arquivos informados (caminhos de arquivos reconhecidos por tipo_do_arquivo).
+    Um arquivo com erro é informado e não impede os demais. Retorna os caminhos gravados.
+    """
+    arquivos = {}
+    for caminho in caminhos:
+        arquivos.setdefault(tipo_do_arquivo(os.path.basename(caminho)), []).append(caminho)
+
+    conn = conexao_escrita()
+    # Os leitores consultam o cache de telefones com conexão somente leitura, que não cria tabelas
+    criar_tabela_telefones(conn)
+    conn.commit()
+    gravados = []
+
+    # Os produtos primeiro, no próprio processo: os leitores dos demais arquivos dependem deles
+    for caminho in arquivos.pop("produtos", []):
+        try:
+            _gravar_lido(conn, caminho, ler_em_processo(caminho))
+            gravados.append(caminho)
+        except Exception as e:
+            print(f"{os.path.basename(caminho):<32} erro: {e}")
+
+    # Leitura paralela dos demais arquivos (as vendas são lidas em lotes durante a gravação).
+    # 'spawn' evita herdar as conexões SQLite abertas neste processo.
+    paralelos = [caminho for tipo, lista in arquivos.items() if tipo not in TIPOS_VENDAS for caminho in lista]
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+        leituras = {caminho: executor.submit(ler_em_processo, caminho) for caminho in paralelos}
+
+        for tipo in ORDEM_CARGA:
+            lista = arquivos.get(tipo, [])
+            if not lista:
+                continue
+            if tipo in TIPOS_VENDAS:
+                nomes = ", ".join(os.path.basename(caminho) for caminho in lista)
+                try:
+                    hash_conteudo = hash_arquivo(lista[0]) if len(lista) == 1 else None
+                    pares = [(os.path.basename(caminho), caminho) for caminho in lista]
+                    linhas, segundos_leitura, segundos_gravacao = gravar_vendas(conn, pares, hash_conteudo)
+                    imprimir_resultado(nomes, linhas, segundos_leitura, segundos_gravacao, sum(map(_megabytes, lista)))
+                    gravados.extend(lista)
+                except Exception as e:
+                    print(f"{nomes:<32} erro: {e}")
+                continue
+            for caminho in lista:
+                try:
+                    _gravar_lido(conn, caminho, leituras[caminho].result())
+                    gravados.append(caminho)
+                except Exception as e:
+                    print(f"{os.path.basename(caminho):<32} erro: {e}")
+    return gravados
+
+def carregar_pasta(pasta, processos=None):
+    """Carrega todos os arquivos reconhecidos da pasta. Retorna os caminhos gravados."""
+    return carregar_arquivos(arquivos_da_pasta(pasta), processos)
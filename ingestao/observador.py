@@ -0,0 +1,107 @@
+import os
+import time
+from datetime import datetime
+from db import conexao_escrita
+from ingestao.leitores import tipo_do_arquivo
+from ingestao.lote import TIPOS_VENDAS, arquivos_da_pasta, carregar_arquivos, hash_arquivo
+
+# --- OBSERVADOR DA PASTA DE CARGAS ---
+# Processo de longa duração, fora do Streamlit (python -m ingestao dados/ --observar), que
+# verifica a pasta a cada 'intervalo' segundos e carrega apenas os arquivos cujo conteúdo mudou.
+# - Impressão digital: tamanho e data de modificação; se mudaram, o conteúdo é comparado pelo
+#   hash sha256 com o da última carga (um arquivo apenas "tocado" não é recarregado).
+# - Um arquivo só é carregado quando o tamanho e a data ficam iguais entre duas verificações,
+#   para não ler uma exportação que o ERP ainda está escrevendo.
+# - A gravação incrementa as versões dos dados (versoes_dados): os dashboards abertos
+#   recarregam os caches na próxima interação, sem precisar reiniciar o app.
+# As impressões digitais ficam na tabela 'arquivos_ingeridos', então reiniciar o observador
+# não recarrega o que já foi carregado.
+
+INTERVALO_PADRAO = 30  # segundos entre verificações
+
+def criar_tabela_arquivos(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS arquivos_ingeridos (
+            caminho TEXT PRIMARY KEY, tamanho INTEGER, modificado REAL, hash_conteudo TEXT, data_hora TEXT
+        )
+    """)
+    conn.commit()
+
+def _impressao_digital(caminho):
+    estado = os.stat(caminho)
+    return estado.st_size, estado.st_mtime
+
+def _registrar_arquivo(conn, caminho, impressao, hash_conteudo):
+    conn.execute(
+        "INSERT OR REPLACE INTO arquivos_ingeridos (caminho, tamanho, modificado, hash_conteudo, data_hora) VALUES (?, ?, ?, ?, ?)",
+        (os.path.abspath(caminho), impressao[0], impressao[1], hash_conteudo, datetime.now().strftime('%d/%m/%Y %H:%M:%S'))
+    )
+    conn.commit()
+
+def arquivos_alterados(conn, caminhos, anteriores):
+    """
+    Retorna {caminho: (impressão digital, hash)} dos arquivos cujo conteúdo mudou desde a
+    última carga e que estão estáveis (mesma impressão digital da verificação anterior,
+    guardada em 'anteriores', que é atualizado aqui).
+    """
+    registrados = {
+        caminho: (tamanho, modificado, hash_conteudo)
+        for caminho, tamanho, modificado, hash_conteudo in conn.execute("SELECT caminho, tamanho, modificado, hash_conteudo FROM arquivos_ingeridos")
+    }
+    alterados = {}
+    for caminho in caminhos:
+        impressao = _impressao_digital(caminho)
+        estavel = anteriores.get(caminho) == impressao
+        anteriores[caminho] = impressao
+        registro = registrados.get(os.path.abspath(caminho))
+        if registro is not None and registro[:2] == impressao:
+            continue
+        if not estavel:
+            continue
+        hash_conteudo = hash_arquivo(caminho)
+        if registro is not None and registro[2] == hash_conteudo:
+            # Mesmo conteúdo com outra data de modificação: só atualiza a impressão digital
+            _registrar_arquivo(conn, caminho, impressao, hash_conteudo)
+            continue
+        alterados[caminho] = (impressao, hash_conteudo)
+    return alterados
+
+def verificar_pasta(pasta, anteriores, processos=None):
+    """Uma verificação da pasta: carrega o que mudou. Retorna os caminhos gravados."""
+    conn = conexao_escrita()
+    criar_tabela_arquivos(conn)
+    caminhos = arquivos_da_pasta(pasta, avisar=False)
+    alterados = arquivos_alterados(conn, caminhos, anteriores)
+    if not alterados:
+        return []
+
+    carregar = list(alterados)
+    if any(tipo_do_arquivo(os.path.basename(caminho)) == "historico_vendas" for caminho in alterados):
+        # O histórico substitui a tabela de vendas inteira: todos os históricos da pasta entram na
+        # carga, e o 'vendas.txt' também, senão o mês atual sumiria até o arquivo mudar de novo
+        # (carregar_arquivos grava na ordem de ORDEM_CARGA: os históricos antes do mês atual)
+        carregar += [
+            caminho for caminho in caminhos
+            if caminho not in alterados and tipo_do_arquivo(os.path.basename(caminho)) in TIPOS_VENDAS
+        ]
+    print(f"[{datetime.now():%d/%m/%Y %H:%M:%S}] carregando: {', '.join(os.path.basename(caminho) for caminho in carregar)}")
+    gravados = carregar_arquivos(carregar, processos)
+    for caminho in gravados:
+        impressao, hash_conteudo = alterados.get(caminho) or (_impressao_digital(caminho), hash_arquivo(caminho))
+        _registrar_arquivo(conn, caminho, impressao, hash_conteudo)
+    return gravados
+
+def observar(pasta, intervalo=INTERVALO_PADRAO, processos=None):
+    """Verifica a pasta indefinidamente (até Ctrl+C), carregando os arquivos alterados."""
+    print(f"Observando '{pasta}' a cada {intervalo}s (Ctrl+C para encerrar)")
+    anteriores = {}
+    try:
+        while True:
+            try:
+                verificar_pasta(pasta, anteriores, processos)
+            except Exception as e:
+                # Um erro em uma verificação não encerra o observador; a próxima tenta de novo
+                print(f"Erro ao verificar a pasta: {e}")
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        print("Observador encerrado.")
@@ -0,0 +1,208 @@
+from dataclasses import dataclass, field
+import pandas as pd
+from utils import clausula_periodo, clausula_anomes
+
+# --- MOTOR DE KPIs DO DASHBOARD DE MARKETING ---
+# Os indicadores de SDR, Suri e RD são calculados com poucas consultas: os conjuntos de
+# clientes de cada canal são montados uma única vez e cruzados com as vendas e pedidos
+# do período já agregados por cliente (um registro por cliente, sem multiplicar valores).
+# Definições:
+# - Total de vendas/pedidos do canal: cada cliente do canal conta uma vez, mesmo com vários
+#   contatos no Suri ou no RD (o JOIN direto com as tabelas de contatos repetia os valores).
+# - Clientes reativados (Suri e RD): clientes do canal que compraram no período e não
+#   compraram nos MESES_REATIVACAO meses anteriores.
+# - Clientes reativados (SDR): clientes qualificados (TAG_QUALIFICADO) que compraram no período.
+
+TAGS_SDR = ['#673AB1', '#673AB2', '#673AB3', '#673AB4', '#673AB5', '#673AB6', '#673AB7']
+TAG_QUALIFICADO = '#673AB4'
+
+# Padrão de quantos meses antes do período são considerados para decidir se um cliente foi reativado
+MESES_REATIVACAO = 3
+
+@dataclass
+class KpisCanal:
+    """Indicadores de um canal (SDR, Suri ou RD) para o período selecionado."""
+    total_vendas: float = 0.0
+    total_pedidos: float = 0.0
+    clientes_novos: int = 0
+    novos_compradores: int = 0
+    clientes_reativados: int = 0
+    # SDR
+    total_clientes: int = 0
+    clientes_qualificados: int = 0
+    # Suri e RD
+    numeros_distintos: int = 0
+    clientes_distintos: int = 0
+    top_clientes: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+@dataclass
+class KpisMarketing:
+    sdr: KpisCanal
+    suri: KpisCanal
+    rd: KpisCanal
+
+def clausula_clientes_novos(nome_coluna_codigo):
+    return f"((CAST({nome_coluna_codigo} AS INTEGER) > 3820 AND CAST({nome_coluna_codigo} AS INTEGER) <= 4000) OR (CAST({nome_coluna_codigo} AS INTEGER) >= 880660003 AND CAST({nome_coluna_codigo} AS INTEGER) <= 980660003))"
+
+def clausula_tags_sdr(coluna_tags):
+    return "(" + " OR ".join(f"{coluna_tags} LIKE '%{tag}%'" for tag in TAGS_SDR) + ")"
+
+# O CodigoCliente do RD pode vir gravado como número (ex.: 1234.0); é normalizado para texto
+_CODIGO_RD = "CASE WHEN typeof(CodigoCliente) IN ('integer', 'real') THEN CAST(CAST(CodigoCliente AS INTEGER) AS TEXT) ELSE CodigoCliente END"
+
+def _cte_membros():
+    """CTE com os clientes de cada canal: uma linha por (canal, codcli)."""
+    return f"""
+        membros AS (
+            SELECT 'sdr' AS canal, Codigo AS codcli FROM clientes WHERE {clausula_tags_sdr('Tags')}
+            UNION SELECT 'sdr_qualificado', Codigo FROM clientes WHERE Tags LIKE '%{TAG_QUALIFICADO}%'
+            UNION SELECT 'suri', codcli FROM suri WHERE codcli != '0'
+            UNION SELECT 'rd', {_CODIGO_RD} FROM rd WHERE CodigoCliente IS NOT NULL AND CodigoCliente != ''
+        )"""
+
+def janela_anterior(ano, meses, meses_anteriores=MESES_REATIVACAO):
+    """Intervalo AnoMes (YYYYMM) dos meses imediatamente anteriores ao primeiro mês selecionado."""
+    indice = int(ano) * 12 + min(meses) - 1
+    inicio, fim = indice - meses_anteriores, indice - 1
+    return (inicio // 12) * 100 + inicio % 12 + 1, (fim // 12) * 100 + fim % 12 + 1
+
+def clientes_reativados(conn, ano, meses, empresa_id, meses_anteriores=MESES_REATIVACAO):
+    """
+    Clientes de cada canal que compraram no período e não compraram nos 'meses_anteriores'
+    meses anteriores a ele. O cálculo é feito no banco com EXCEPT sobre o resumo mensal.
+    Retorna um DataFrame com as colunas 'canal' e 'Codcli'.
+    """
+    if not meses:
+        return pd.DataFrame(columns=['canal', 'Codcli'])
+    filtro_empresa_v = f"AND v.Empresa = '{empresa_id}'" if empresa_id != "Todos" else ""
+    inicio_anterior, fim_anterior = janela_anterior(ano, meses, meses_anteriores)
+    query = f"""
+        WITH {_cte_membros()},
+        reativados AS (
+            SELECT v.Codcli FROM vendas_mensal v
+            WHERE {clausula_anomes('v.AnoMes', ano, meses)} {filtro_empresa_v}
+            EXCEPT
+            SELECT v.Codcli FROM vendas_mensal v
+            WHERE v.AnoMes BETWEEN {inicio_anterior} AND {fim_anterior} {filtro_empresa_v}
+        )
+        SELECT m.canal, r.Codcli FROM reativados r JOIN membros m ON m.codcli = r.Codcli
+    """
+    return pd.read_sql_query(query, conn)
+
+def _consultar_fatos(conn, ano, meses, empresa_id):
+    """Vendas, pedidos, compradores e novos compradores de todos os canais em uma consulta."""
+    filtro_empresa_v = f"AND v.Empresa = '{empresa_id}'" if empresa_id != "Todos" else ""
+    filtro_empresa_p = f"AND p.Empresa = '{empresa_id}'" if empresa_id != "Todos" else ""
+    query = f"""
+        WITH {_cte_membros()},
+        vendas_periodo AS (
+            SELECT v.Codcli, SUM(v.Valor_Total) AS valor
+            FROM vendas_mensal v
+            WHERE {clausula_anomes('v.AnoMes', ano, meses)} {filtro_empresa_v}
+            GROUP BY v.Codcli
+        ),
+        pedidos_periodo AS (
+            SELECT p.Codcli, SUM(p.Vlr_Liquido) AS liquido, SUM(p.Qt_Vend * p.Vlr_Unit) AS bruto
+            FROM pedidos p
+            WHERE {clausula_periodo('p.Dt_Entrega_chave', ano, meses)} {filtro_empresa_p}
+            GROUP BY p.Codcli
+        )
+        SELECT
+            m.canal,
+            COALESCE(SUM(vp.valor), 0) AS total_vendas,
+            COALESCE(SUM(pp.liquido), 0) AS pedidos_liquido,
+            COALESCE(SUM(pp.bruto), 0) AS pedidos_bruto,
+            COUNT(CASE WHEN vp.Codcli IS NOT NULL AND {clausula_clientes_novos('m.codcli')} THEN 1 END) AS novos_compradores,
+            COUNT(vp.Codcli) AS compradores
+        FROM membros m
+        LEFT JOIN vendas_periodo vp ON vp.Codcli = m.codcli
+        LEFT JOIN pedidos_periodo pp ON pp.Codcli = m.codcli
+        GROUP BY m.canal
+    """
+    return pd.read_sql_query(query, conn).set_index('canal')
+
+def _consultar_contagens(conn, ano, meses):
+    """Contagens que não dependem de vendas: clientes por tag e contatos de Suri/RD no período."""
+    query = f"""
+        SELECT
+            (SELECT COUNT(Codigo) FROM clientes WHERE {clausula_tags_sdr('Tags')}) AS sdr_total_clientes,
+            (SELECT COUNT(Codigo) FROM clientes WHERE Tags = '{TAG_QUALIFICADO}') AS sdr_qualificados,
+            (SELECT COUNT(Codigo) FROM clientes WHERE {clausula_tags_sdr('Tags')} AND {clausula_clientes_novos('Codigo')}) AS sdr_novos,
+            (SELECT COUNT(DISTINCT Numero) FROM suri WHERE {clausula_periodo('Primeiro_Contato_chave', ano, meses)}) AS suri_numeros,
+            (SELECT COUNT(DISTINCT codcli) FROM suri WHERE codcli != '0' AND {clausula_periodo('Primeiro_Contato_chave', ano, meses)}) AS suri_clientes,
+            (SELECT COUNT(DISTINCT codcli) FROM suri WHERE codcli != '0' AND {clausula_clientes_novos('codcli')}) AS suri_novos,
+            (SELECT COUNT(DISTINCT Celular) FROM rd WHERE {clausula_periodo('Data_ultima_conversao_chave', ano, meses)}) AS rd_numeros,
+            (SELECT COUNT(DISTINCT CodigoCliente) FROM rd WHERE CodigoCliente IS NOT NULL AND CodigoCliente != '' AND {clausula_periodo('Data_ultima_conversao_chave', ano, meses)}) AS rd_clientes,
+            (SELECT COUNT(DISTINCT CodigoCliente) FROM rd WHERE CodigoCliente IS NOT NULL AND CodigoCliente != '' AND {clausula_clientes_novos('CodigoCliente')}) AS rd_novos
+    """
+    return pd.read_sql_query(query, conn).iloc[0]
+
+def _consultar_top_clientes(conn, ano, meses, empresa_id, limite=10):
+    """Os maiores clientes (por valor vendido no período) de Suri e RD."""
+    filtro_empresa_v = f"AND v.Empresa = '{empresa_id}'" if empresa_id != "Todos" else ""
+    query = f"""
+        WITH {_cte_membros()},
+        vendas_periodo AS (
+            SELECT v.Codcli, SUM(v.Valor_Total) AS valor
+            FROM vendas_mensal v
+            WHERE {clausula_anomes('v.AnoMes', ano, meses)} {filtro_empresa_v}
+            GROUP BY v.Codcli
+        ),
+        ranking AS (
+            SELECT m.canal, c.Nome, c.Estado, SUM(vp.valor) AS Valor_Total,
+                   ROW_NUMBER() OVER (PARTITION BY m.canal ORDER BY SUM(vp.valor) DESC) AS posicao
+            FROM membros m
+            JOIN vendas_periodo vp ON vp.Codcli = m.codcli
+            JOIN clientes c ON c.Codigo = m.codcli
+            WHERE m.canal IN ('suri', 'rd')
+            GROUP BY m.canal, c.Nome, c.Estado
+        )
+        SELECT canal, Nome, Estado, Valor_Total FROM ranking WHERE posicao <= {limite} ORDER BY canal, posicao
+    """
+    df = pd.read_sql_query(query, conn).rename(columns={'Nome': 'Cliente', 'Estado': 'UF', 'Valor_Total': 'Valor Total (R$)'})
+    return {canal: grupo.drop(columns='canal').reset_index(drop=True) for canal, grupo in df.groupby('canal')}
+
+def calcular_kpis_marketing(conn, ano, meses, empresa_id, meses_reativacao=MESES_REATIVACAO):
+    """
+    Calcula todos os indicadores do dashboard de marketing para a empresa, o ano e os meses informados.
+    'meses_reativacao' é a janela usada para decidir se um cliente foi reativado.
+    Retorna um KpisMarketing com os indicadores de SDR, Suri e RD.
+    """
+    contagens = _consultar_contagens(conn, ano, meses)
+    kpis = KpisMarketing(
+        sdr=KpisCanal(
+            total_clientes=int(contagens['sdr_total_clientes']),
+            clientes_qualificados=int(contagens['sdr_qualificados']),
+            clientes_novos=int(contagens['sdr_novos']),
+        ),
+        suri=KpisCanal(
+            numeros_distintos=int(contagens['suri_numeros']),
+            clientes_distintos=int(contagens['suri_clientes']),
+            clientes_novos=int(contagens['suri_novos']),
+        ),
+        rd=KpisCanal(
+            numeros_distintos=int(contagens['rd_numeros']),
+            clientes_distintos=int(contagens['rd_clientes']),
+            clientes_novos=int(contagens['rd_novos']),
+        ),
+    )
+    if not meses:
+        return kpis
+
+    fatos = _consultar_fatos(conn, ano, meses, empresa_id).reindex(['sdr', 'sdr_qualificado', 'suri', 'rd'], fill_value=0)
+    reativados = clientes_reativados(conn, ano, meses, empresa_id, meses_reativacao)['canal'].value_counts()
+    for canal, kpis_canal in (('sdr', kpis.sdr), ('suri', kpis.suri), ('rd', kpis.rd)):
+        linha = fatos.loc[canal]
+        kpis_canal.total_vendas = float(linha['total_vendas'])
+        # O Suri considera o valor bruto dos pedidos (quantidade x valor unitário)
+        kpis_canal.total_pedidos = float(linha['pedidos_bruto'] if canal == 'suri' else linha['pedidos_liquido'])
+        kpis_canal.novos_compradores = int(linha['novos_compradores'])
+    kpis.suri.clientes_reativados = int(reativados.get('suri', 0))
+    kpis.rd.clientes_reativados = int(reativados.get('rd', 0))
+    # No SDR, "reativados" são os clientes qualificados que compraram no período
+    kpis.sdr.clientes_reativados = int(fatos.loc['sdr_qualificado', 'compradores'])
+
+    top_clientes = _consultar_top_clientes(conn, ano, meses, empresa_id)
+    kpis.suri.top_clientes = top_clientes.get('suri', pd.DataFrame())
+    kpis.rd.top_clientes = top_clientes.get('rd', pd.DataFrame())
+    return kpis
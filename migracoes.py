@@ -0,0 +1,204 @@
+from datetime import datetime
+from esquema import migrar_chaves_data, aplicar_indices, adicionar_colunas
+from db import criar_tabela_versoes
+from resumos import criar_tabelas_resumo, atualizar_resumo_vendas, resumo_vendas_vazio, atualizar_resumo_estoque, resumo_estoque_vazio
+from unidades import migrar_rolos
+from busca import migrar_indice_busca
+from carga import criar_tabela_historico, limpar_stagings
+from ingestao.leitores import COLUNAS_VENDAS
+from suri_api import COLUNAS_SURI
+
+# --- MIGRAÇÕES DO ESQUEMA ---
+# O esquema do banco evolui por passos numerados em MIGRACOES, aplicados em ordem uma única
+# vez: a tabela 'schema_version' guarda os passos já aplicados, então um banco novo recebe
+# todos e um banco de uma versão anterior só recebe os que faltam. Todo passo é idempotente
+# (IF NOT EXISTS, colunas criadas só quando faltam), para ser seguro reaplicá-lo.
+# Para mudar o esquema, acrescente um passo ao final da lista; nunca altere os já publicados.
+#
+# Além dos passos, corrigir_esquema repara desvios que as cargas podem causar: uma tabela
+# recriada a partir do arquivo (staging renomeada no lugar dela) perde índices e colunas que
+# não vieram no arquivo. Ela roda ao iniciar o processo e após cada carga.
+
+# tabela -> colunas (coluna -> tipo SQL) que as páginas esperam encontrar
+COLUNAS_ESPERADAS = {
+    "vendas": COLUNAS_VENDAS,
+    "suri": COLUNAS_SURI,
+}
+
+def _criar_tabelas_base(conn):
+    """Cria as tabelas do sistema que ainda não existem."""
+    cursor = conn.cursor()
+    # Tabela de usuários
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            username TEXT PRIMARY KEY, name TEXT NOT NULL, password TEXT NOT NULL, role TEXT NOT NULL
+        )
+    """)
+    # Tabela de permissões
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS permissoes (
+            role TEXT NOT NULL, page_name TEXT NOT NULL, PRIMARY KEY (role, page_name)
+        )
+    """)
+    # Tabela de estoque
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estoque (
+            codpro TEXT, produto TEXT, qtde REAL, deposito TEXT, rolos REAL
+        )
+    """)
+    # Tabela de importações
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS imports (
+            nome TEXT, Data_prevista TEXT, CodPro TEXT, Descricao TEXT, Rolos REAL, 
+            M2 REAL, Status_fabrica TEXT, Recebido TEXT, reservado TEXT,
+            Data_prevista_chave INTEGER
+        )
+    """)
+    
+    # Cadastros, vendas e contatos
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clientes (
+            Codigo TEXT, Nome TEXT, Tipo_Pessoa TEXT, Email TEXT, Estado TEXT,
+            Cidade TEXT, Fone TEXT, Segmento TEXT, Vendedor TEXT, Representante TEXT,
+            Situacao TEXT, Tipo_Fiscal TEXT, Papeis TEXT, Tags TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS produtos (
+            codpro TEXT PRIMARY KEY, descricao TEXT, m2 REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS vendas (
+            Data_NF TEXT, Num_NF TEXT, Codcli TEXT, Nome_do_Cliente TEXT, UF TEXT,
+            Codpro TEXT, QtdeFaturada REAL, Vlr_Unitario REAL, Valor_Total REAL,
+            Vend TEXT, Empresa TEXT, Data_NF_chave INTEGER,
+            CFOP INTEGER, Repr TEXT, Cla INTEGER, SCl INTEGER, Referencia TEXT
+        )
+    """)
+    # Tabela de pedidos
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pedidos (
+            Tipo TEXT, Num_Ped TEXT, Dt_Pedido TEXT, Dt_Entrega TEXT, Codcli TEXT, 
+            Nome_Cli TEXT, Codpro TEXT, Descricao_Produto TEXT, Qt_Vend REAL, 
+            Vlr_Unit REAL, Vlr_Liquido REAL, OC TEXT, Cod_Vend TEXT, Nome_Vend TEXT, 
+            Num_Ped_Web TEXT, Empresa TEXT, Dt_Pedido_chave INTEGER, Dt_Entrega_chave INTEGER, Rolos REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS suri (
+            suri_id TEXT, telefone_suri TEXT, Numero TEXT, Documento_Identificacao TEXT,
+            Genero TEXT, Id_Canal TEXT, Tipo_Canal TEXT, Primeiro_Contato TEXT,
+            Hora_Primeiro_Contato TEXT, Ultima_Atividade TEXT, Observacao TEXT,
+            codcli TEXT, Nome TEXT, Email TEXT, Ultimo_Atendente TEXT,
+            Primeiro_Contato_chave INTEGER, Ultima_Atividade_chave INTEGER
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rd (
+            Email TEXT, Nome TEXT, Telefone TEXT, Celular TEXT, Empresa TEXT, 
+            Estado TEXT, Total_conversoes INTEGER, Data_primeira_conversao TEXT,
+            Origem_primeira_conversao TEXT, Data_ultima_conversao TEXT,
+            Origem_ultima_conversao TEXT, CNPJ TEXT, CodigoCliente TEXT,
+            Data_primeira_conversao_chave INTEGER, Data_ultima_conversao_chave INTEGER
+        )
+    """)
+    cursor.execute("CREATE TABLE IF NOT EXISTS tag (tag_id TEXT, tag_nome TEXT)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS vendedores (codvend TEXT, vendedor_nome TEXT)")
+    conn.commit()
+
+def _criar_tabelas_controle(conn):
+    # Versões dos dados (invalidação dos caches) e histórico de cargas. A fila de tarefas é
+    # criada pela própria thread de trabalho (ver tarefas.py).
+    criar_tabela_versoes(conn)
+    criar_tabela_historico(conn)
+
+def _criar_resumos(conn):
+    # Tabelas de resumo de vendas e estoque, montadas a partir dos dados existentes
+    criar_tabelas_resumo(conn)
+    if resumo_vendas_vazio(conn):
+        atualizar_resumo_vendas(conn)
+    if resumo_estoque_vazio(conn):
+        atualizar_resumo_estoque(conn)
+
+def _adicionar_colunas_esperadas(conn):
+    for tabela, colunas in COLUNAS_ESPERADAS.items():
+        adicionar_colunas(conn, tabela, colunas)
+
+# (versão, descrição, função)
+MIGRACOES = [
+    (1, "Tabelas base", _criar_tabelas_base),
+    (2, "Chaves de data (YYYYMMDD)", migrar_chaves_data),
+    (3, "Quantidade em rolos", migrar_rolos),
+    (4, "Índices gerenciados", aplicar_indices),
+    (5, "Índice de busca textual (FTS5)", migrar_indice_busca),
+    (6, "Versões dos dados e histórico de cargas", _criar_tabelas_controle),
+    (7, "Resumos de vendas e estoque", _criar_resumos),
+    (8, "Colunas analíticas das vendas e colunas da API do Suri", _adicionar_colunas_esperadas),
+]
+
+def criar_tabela_schema_version(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (versao INTEGER PRIMARY KEY, descricao TEXT, aplicada_em TEXT)")
+    conn.commit()
+
+def versao_esquema(conn):
+    """Maior versão de migração já aplicada no banco (0 se nenhuma)."""
+    criar_tabela_schema_version(conn)
+    return conn.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_version").fetchone()[0]
+
+def aplicar_migracoes(conn):
+    """Aplica, em ordem, as migrações ainda não registradas. Retorna as versões aplicadas."""
+    atual = versao_esquema(conn)
+    aplicadas = []
+    for versao, descricao, funcao in MIGRACOES:
+        if versao <= atual:
+            continue
+        funcao(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO schema_version (versao, descricao, aplicada_em) VALUES (?, ?, ?)",
+            (versao, descricao, datetime.now().strftime('%d/%m/%Y %H:%M:%S'))
+        )
+        conn.commit()
+        aplicadas.append(versao)
+    return aplicadas
+
+def corrigir_esquema(conn, tabelas=None):
+    """
+    Repara desvios do esquema nas tabelas informadas (ou em todas): recria as colunas
+    esperadas que faltarem e os índices gerenciados. Não recalcula dados.
+    """
+    for tabela, colunas in COLUNAS_ESPERADAS.items():
+        if tabelas is None or tabela in tabelas:
+            adicionar_colunas(conn, tabela, colunas)
+    aplicar_indices(conn, tabelas)
+
+def criar_usuario_master(conn):
+    """Cria o usuário 'master' (senha '123') se não houver nenhum usuário. Retorna True se criou."""
+    if conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] > 0:
+        return False
+    import bcrypt  # só na criação do primeiro usuário
+    hashed_password = bcrypt.hashpw('123'.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    conn.execute(
+        "INSERT INTO usuarios (username, name, password, role) VALUES (?, ?, ?, ?)",
+        ('master', 'Usuário Master', hashed_password, 'Master')
+    )
+    conn.commit()
+    return True
+
+def preparar_banco(conn):
+    """
+    Deixa o banco pronto para uso: aplica as migrações pendentes, corrige os desvios do
+    esquema e garante o usuário inicial. Chamada uma vez por processo.
+    Retorna True se o usuário 'master' padrão foi criado agora.
+    """
+    aplicar_migracoes(conn)
+    # Bancos copiados ou carregados por fora do app: chaves de data, rolos, índices de busca e
+    # resumos que faltarem são refeitos (cada verificação só trabalha se faltar algo)
+    migrar_chaves_data(conn)
+    migrar_rolos(conn)
+    migrar_indice_busca(conn)
+    _criar_resumos(conn)
+    corrigir_esquema(conn)
+    # Stagings de cargas interrompidas (processo encerrado no meio da carga)
+    limpar_stagings(conn)
+    return criar_usuario_master(conn)
@@ -1,61 +1,17 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
-import bcrypt
 import os
+from db import conexao_escrita, incrementar_versao
+from auth import verificar_permissao
 
-# --- BLOCO DE CONTROLE DE ACESSO (sem alterações) ---
-@st.cache_data(ttl=30)
-def get_user_permissions_from_db(_role):
-    if not _role: return []
-    try:
-        conn = sqlite3.connect("gestor_mkt.db", check_same_thread=False)
-        query = "SELECT page_name FROM permissoes WHERE role = ?"
-        df_perms = pd.read_sql_query(query, conn, params=(_role,))
-        conn.close()
-        return df_perms['page_name'].tolist()
-    except: return []
-
-def check_permission():
-    if not st.session_state.get("authentication_status"):
-        st.error("Acesso negado. Por favor, faça o login.")
-        st.switch_page("app.py")
-        st.stop()
-
-    # 2. Garante que as permissões estão carregadas na sessão (essencial para reloads de página)
-    if "permissions" not in st.session_state or st.session_state.permissions is None:
-        role = st.session_state.get("role")
-        if not role: # Se o perfil não existir na sessão, busca de novo
-             conn = sqlite3.connect("gestor_mkt.db", check_same_thread=False)
-             username = st.session_state.get("username")
-             df_user = pd.read_sql_query(f"SELECT role FROM usuarios WHERE username = '{username}'", conn)
-             conn.close()
-             if not df_user.empty:
-                 role = df_user.iloc[0]['role']
-                 st.session_state["role"] = role
-        st.session_state["permissions"] = get_user_permissions_from_db(role)
-
-    # 3. Executa a verificação
-    page_name = os.path.splitext(os.path.basename(__file__))[0]
-    
-    # O perfil Master sempre tem acesso
-    if st.session_state.get("role") == "Master":
-        return
-        
-    allowed_pages = st.session_state.get("permissions", [])
-    if page_name not in allowed_pages:
-        st.error("Você não tem permissão para acessar esta página.")
-        st.stop()
-
-check_permission()
-# --- FIM DO NOVO BLOCO ---
-# --- FIM DO BLOCO ---
+# --- CONTROLE DE ACESSO ---
+verificar_permissao(__file__)
 
 st.set_page_config(page_title="Gerenciamento de Acesso", layout="wide")
 st.title("🔐 Gerenciamento de Acesso")
 
-DB_FILE = "gestor_mkt.db"
-conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+conn = conexao_escrita()
 
 ROLES = ["Master", "Diretor", "Gerente", "Vendedor", "Representante"]
 PAGES = sorted([file.replace(".py", "") for file in os.listdir("pages") if file.endswith(".py") and not file.startswith("0_")])
@@ -88,12 +44,9 @@ with tab1:
                             dados_para_inserir = [(perfil_selecionado, page) for page in paginas_selecionadas]
                             cursor.executemany("INSERT INTO permissoes (role, page_name) VALUES (?, ?)", dados_para_inserir)
                         conn.commit()
-
-                        # --- LINHA CORRIGIDA ---
-                        # A mensagem de sucesso agora ficará visível e o cache será limpo.
-                        # A linha st.rerun() foi removida.
+                        # A nova versão de 'permissoes' invalida o cache do guarda (auth.py) para todos os usuários
+                        incrementar_versao(conn, 'permissoes')
                         st.success(f"Permissões para '{perfil_selecionado}' atualizadas com sucesso!")
-                        st.cache_data.clear()
 
                     except Exception as e:
                         st.error(f"Erro ao salvar permissões: {e}")
@@ -113,12 +66,14 @@ with tab2:
                 st.error("As senhas não coincidem.")
             else:
                 try:
+                    import bcrypt  # só ao criar o usuário
                     password_bytes = password.encode('utf-8')
                     salt = bcrypt.gensalt()
                     hashed_password = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
                     cursor = conn.cursor()
                     cursor.execute("INSERT INTO usuarios (username, name, password, role) VALUES (?, ?, ?, ?)", (username, name, hashed_password, role))
                     conn.commit()
+                    incrementar_versao(conn, 'usuarios')
                     st.success(f"Usuário '{username}' criado com sucesso!")
                 except sqlite3.IntegrityError:
                     st.error(f"Erro: O usuário '{username}' já existe.")
@@ -142,8 +97,8 @@ with tab3:
                     cursor = conn.cursor()
                     cursor.execute("DELETE FROM usuarios WHERE username = ?", (usuario_selecionado,))
                     conn.commit()
+                    incrementar_versao(conn, 'usuarios')
                     st.success(f"Usuário '{usuario_selecionado}' excluído!")
                     st.rerun()
                 except Exception as e:
-                    st.error(f"Erro ao excluir usuário: {e}")
-conn.close()
\ No newline at end of file
+                    st.error(f"Erro ao excluir usuário: {e}")
\ No newline at end of file
@@ -1,55 +1,14 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 from datetime import datetime
-import os
+from utils import clausula_anomes
+from db import conexao_leitura, versao_dados
+from busca import buscar_chaves, chave_busca, mascara_busca
+from exibicao import mostrar_tabela
+from auth import verificar_permissao
 
-# --- NOVO BLOCO DE CONTROLE DE ACESSO ---
-@st.cache_data(ttl=30)
-def get_user_permissions_from_db(_role):
-    if not _role: return []
-    try:
-        conn = sqlite3.connect("gestor_mkt.db", check_same_thread=False)
-        query = "SELECT page_name FROM permissoes WHERE role = ?"
-        df_perms = pd.read_sql_query(query, conn, params=(_role,))
-        conn.close()
-        return df_perms['page_name'].tolist()
-    except: return []
-
-def check_permission():
-    # 1. Se não estiver logado, redireciona para o login
-    if not st.session_state.get("authentication_status"):
-        st.error("Acesso negado. Por favor, faça o login.")
-        st.switch_page("app.py")
-        st.stop()
-
-    # 2. Garante que as permissões estão carregadas na sessão (essencial para reloads de página)
-    if "permissions" not in st.session_state or st.session_state.permissions is None:
-        role = st.session_state.get("role")
-        if not role: # Se o perfil não existir na sessão, busca de novo
-             conn = sqlite3.connect("gestor_mkt.db", check_same_thread=False)
-             username = st.session_state.get("username")
-             df_user = pd.read_sql_query(f"SELECT role FROM usuarios WHERE username = '{username}'", conn)
-             conn.close()
-             if not df_user.empty:
-                 role = df_user.iloc[0]['role']
-                 st.session_state["role"] = role
-        st.session_state["permissions"] = get_user_permissions_from_db(role)
-
-    # 3. Executa a verificação
-    page_name = os.path.splitext(os.path.basename(__file__))[0]
-    
-    # O perfil Master sempre tem acesso
-    if st.session_state.get("role") == "Master":
-        return
-        
-    allowed_pages = st.session_state.get("permissions", [])
-    if page_name not in allowed_pages:
-        st.error("Você não tem permissão para acessar esta página.")
-        st.stop()
-
-check_permission()
-# --- FIM DO NOVO BLOCO ---
+# --- CONTROLE DE ACESSO ---
+verificar_permissao(__file__)
 
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
@@ -58,18 +17,17 @@ st.title("💰 Análise de Vendas")
 st.markdown("---")
 
 # --- CONEXÃO COM O BANCO DE DADOS E FUNÇÕES DE APOIO ---
-DB_FILE = "gestor_mkt.db"
-conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+conn = conexao_leitura()
 
 def formatar_valor(valor, is_currency=False, decimais=0):
     if pd.isna(valor) or not isinstance(valor, (int, float, complex)): return valor
     prefixo = "R$ " if is_currency else ""
     return prefixo + f"{valor:,.{decimais}f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-@st.cache_data(ttl=600)
-def get_dados_filtro(_conexao, empresa_id):
+@st.cache_data(max_entries=20)
+def get_dados_filtro(_conexao, empresa_id, versao):
     filtro_empresa = f"WHERE Empresa = '{empresa_id}'" if empresa_id != "Todos" else ""
-    query_anos = f"SELECT DISTINCT strftime('%Y', substr(Data_NF, 7, 4) || '-' || substr(Data_NF, 4, 2) || '-' || substr(Data_NF, 1, 2)) as ano FROM vendas {filtro_empresa}"
+    query_anos = f"SELECT DISTINCT CAST(Ano AS TEXT) as ano FROM vendas_mensal {filtro_empresa}"
     query_vendedores = "SELECT codvend, vendedor_nome FROM vendedores ORDER BY vendedor_nome"
     try:
         df_anos = pd.read_sql_query(query_anos, _conexao)
@@ -85,7 +43,7 @@ st.sidebar.header("Filtros")
 empresas_map = {"Todos": "Todos", "Distribuidora": "1", "Loja": "3"}
 empresa_selecionada_nome = st.sidebar.selectbox("Empresa", list(empresas_map.keys()), key="vendas_empresa")
 empresa_selecionada_id = empresas_map[empresa_selecionada_nome]
-anos_disponiveis, vendedores_map = get_dados_filtro(conn, empresa_selecionada_id)
+anos_disponiveis, vendedores_map = get_dados_filtro(conn, empresa_selecionada_id, versao_dados('vendas_mensal', 'vendedores'))
 agora = datetime.now()
 ano_atual = str(agora.year)
 mes_atual_num = agora.month
@@ -98,24 +56,29 @@ vendedores_selecionados_nomes = st.sidebar.multiselect("Vendedor", options=list(
 vendedores_selecionados_ids = [vendedores_map[nome] for nome in vendedores_selecionados_nomes]
 
 # --- FUNÇÃO PRINCIPAL PARA CARREGAR DADOS ---
-@st.cache_data(ttl=600)
-def carregar_dados_vendas(_conexao, ano, meses, empresa, vendedores_ids):
+# Lê o resumo mensal (vendas_mensal), que já tem todas as dimensões usadas na página
+@st.cache_data(max_entries=50)
+def carregar_dados_vendas(_conexao, ano, meses, empresa, vendedores_ids, versao):
     if not meses or not vendedores_ids: return pd.DataFrame()
-    clausula_ano = f"strftime('%Y', substr(v.Data_NF, 7, 4) || '-' || substr(v.Data_NF, 4, 2) || '-' || substr(v.Data_NF, 1, 2)) = '{ano}'"
-    lista_meses_formatada = [f"'{str(m).zfill(2)}'" for m in meses]
-    clausula_meses = f"strftime('%m', substr(v.Data_NF, 7, 4) || '-' || substr(v.Data_NF, 4, 2) || '-' || substr(v.Data_NF, 1, 2)) IN ({', '.join(lista_meses_formatada)})"
+    clausula_data = clausula_anomes('v.AnoMes', ano, meses)
     filtro_empresa = f"AND v.Empresa = '{empresa}'" if empresa != "Todos" else ""
     lista_vendedores_formatada = [f"'{str(v)}'" for v in vendedores_ids]
     filtro_vendedores = f"AND v.Vend IN ({','.join(lista_vendedores_formatada)})"
-    query = f"SELECT v.*, p.descricao as Descricao_Produto, p.m2, COALESCE(vend.vendedor_nome, 'Inativo') as Nome_Vendedor FROM vendas v LEFT JOIN produtos p ON v.Codpro = p.codpro LEFT JOIN vendedores vend ON v.Vend = vend.codvend WHERE {clausula_ano} AND {clausula_meses} {filtro_empresa} {filtro_vendedores}"
+    # Subconsultas em vez de JOIN: produtos e vendedores não têm chave única e um código repetido duplicaria as vendas
+    query = f"""
+        SELECT v.*,
+            (SELECT p.descricao FROM produtos p WHERE p.codpro = v.Codpro LIMIT 1) as Descricao_Produto,
+            COALESCE((SELECT vend.vendedor_nome FROM vendedores vend WHERE vend.codvend = v.Vend LIMIT 1), 'Inativo') as Nome_Vendedor
+        FROM vendas_mensal v
+        WHERE {clausula_data} {filtro_empresa} {filtro_vendedores}
+    """
     df = pd.read_sql_query(query, _conexao)
     if not df.empty:
-        for col in ['Valor_Total', 'QtdeFaturada', 'm2']: df[col] = pd.to_numeric(df[col], errors='coerce')
-        df['Rolos'] = df.apply(lambda row: row['QtdeFaturada'] / row['m2'] if row['m2'] and row['m2'] > 0 else 0, axis=1)
-        df['Mes'] = pd.to_datetime(df['Data_NF'], format='%d/%m/%Y').dt.month.map(meses_pt)
+        for col in ['Valor_Total', 'QtdeFaturada', 'Rolos']: df[col] = pd.to_numeric(df[col], errors='coerce')
+        df['Mes'] = df['Mes'].map(meses_pt)
     return df
 
-df_base = carregar_dados_vendas(conn, ano_selecionado, meses_selecionados_nums, empresa_selecionada_id, vendedores_selecionados_ids)
+df_base = carregar_dados_vendas(conn, ano_selecionado, meses_selecionados_nums, empresa_selecionada_id, vendedores_selecionados_ids, versao_dados('vendas_mensal', 'produtos', 'vendedores'))
 
 # --- INICIALIZAÇÃO E LÓGICA DO FILTRO DE PESQUISA COM SESSION STATE ---
 if 'pesquisa_vendas' not in st.session_state:
@@ -129,11 +92,24 @@ if st.button("Limpar Filtro da Pesquisa"):
     st.rerun()
 
 df_para_visualizacao = df_base.copy()
-if st.session_state.pesquisa_vendas:
+if st.session_state.pesquisa_vendas and not df_base.empty:
     termo = st.session_state.pesquisa_vendas
-    # Procura o termo em colunas relevantes
-    cols_pesquisa = ['Nome_do_Cliente', 'UF', 'Descricao_Produto', 'Nome_Vendedor']
-    df_para_visualizacao = df_base[df_base[cols_pesquisa].astype(str).apply(lambda x: x.str.contains(termo, case=False)).any(axis=1)]
+    # Só nas colunas que a busca por texto usava: nome do cliente e descrição do produto
+    chaves_clientes = buscar_chaves(conn, 'clientes', termo, ['Nome'])
+    chaves_produtos = buscar_chaves(conn, 'produtos', termo, ['descricao'])
+    if chaves_clientes is not None and chaves_produtos is not None:
+        # Clientes e produtos pelo índice de busca (sem acentos, por prefixo);
+        # UF e vendedor são poucos valores distintos e continuam por texto
+        mascara = df_base['Codcli'].astype(str).isin(chaves_clientes) | df_base['Codpro'].astype(str).isin(chaves_produtos)
+        for col in ['UF', 'Nome_Vendedor']:
+            valores = pd.Series(df_base[col].astype(str).unique())
+            encontrados = valores[valores.str.contains(termo, case=False, regex=False)]
+            mascara |= df_base[col].astype(str).isin(encontrados)
+        df_para_visualizacao = df_base[mascara]
+    else:
+        # Sem índice de busca: procura o termo em colunas relevantes (busca vetorizada)
+        cols_pesquisa = ['Nome_do_Cliente', 'UF', 'Descricao_Produto', 'Nome_Vendedor']
+        df_para_visualizacao = df_base[mascara_busca(chave_busca(df_base, cols_pesquisa), termo)]
 
 # --- SEÇÃO PRINCIPAL ---
 if not df_para_visualizacao.empty:
@@ -196,18 +172,9 @@ if not df_para_visualizacao.empty:
         final_cols = ["Nome_do_Cliente", "Nome_Vendedor"] + ordem_meses + ["Média", "Total"]
         pivot_table_display = pivot_table_display[final_cols]
     
-    formatter = "{:,.0f}"
-    prefixo = "R$ " if is_currency_view else ""
-    format_dict = {col: (prefixo + formatter) for col in pivot_table_display.columns if col not in ['Nome_do_Cliente', 'Nome_Vendedor', 'UF', 'Descricao_Produto']}
+    colunas_numericas = [col for col in pivot_table_display.columns if col not in ['Nome_do_Cliente', 'Nome_Vendedor', 'UF', 'Descricao_Produto']]
     config_coluna_indice = {col: st.column_config.Column(width="large") for col in (coluna_indice if isinstance(coluna_indice, list) else [coluna_indice])}
     
-    st.dataframe(
-    pivot_table_display.style.format(format_dict, na_rep="-").set_properties(**{'text-align': 'right'}),
-    width='stretch',
-    column_config=config_coluna_indice,
-    hide_index=True
-)
+    mostrar_tabela(pivot_table_display, colunas_numericas, moeda=is_currency_view, column_config=config_coluna_indice)
 else:
-    st.warning("Nenhum dado de venda encontrado para os filtros selecionados.")
-
-conn.close()
\ No newline at end of file
+    st.warning("Nenhum dado de venda encontrado para os filtros selecionados.")
\ No newline at end of file
@@ -1,59 +1,33 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
-import os
 from datetime import datetime
+from db import conexao_leitura, versao_dados
+from busca import chave_busca, mascara_busca
+from exibicao import mostrar_tabela
+from auth import verificar_permissao
 
-# --- BLOCO DE CONTROLE DE ACESSO ---
-@st.cache_data(ttl=30)
-def get_user_permissions_from_db(_role):
-    if not _role: return []
-    try:
-        conn = sqlite3.connect("gestor_mkt.db", check_same_thread=False)
-        query = "SELECT page_name FROM permissoes WHERE role = ?"
-        df_perms = pd.read_sql_query(query, conn, params=(_role,))
-        conn.close()
-        return df_perms['page_name'].tolist()
-    except: return []
-
-def check_permission():
-    if not st.session_state.get("authentication_status"):
-        st.error("Acesso negado. Por favor, faça o login.")
-        st.switch_page("app.py")
-        st.stop()
-    page_name = os.path.splitext(os.path.basename(__file__))[0]
-    if st.session_state.get("role") == "Master": return
-    if "permissions" not in st.session_state or st.session_state.permissions is None:
-        st.session_state["permissions"] = get_user_permissions_from_db(st.session_state.get("role"))
-    if page_name not in st.session_state.get("permissions", []):
-        st.error("Você não tem permissão para acessar esta página.")
-        st.stop()
-check_permission()
-# --- FIM DO BLOCO ---
+# --- CONTROLE DE ACESSO ---
+verificar_permissao(__file__)
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(page_title="Importações", page_icon="🚢", layout="wide")
 st.title("🚢 Análise de Importações")
 
+# Os caches são invalidados pela versão dos dados; o botão apenas recarrega a página
 if st.button("🔄 Atualizar Dados"):
-    st.cache_data.clear()
     st.toast("Dados de importação atualizados!", icon="✅")
     st.rerun()
 st.markdown("---")
 
 # --- FUNÇÕES E CARREGAMENTO DE DADOS ---
-DB_FILE = "gestor_mkt.db"
-
 def formatar_valor(valor, decimais=0):
     if pd.isna(valor): return ""
     return f"{valor:,.{decimais}f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-@st.cache_data(ttl=600)
-def carregar_dados_imports():
+@st.cache_data(max_entries=2)
+def carregar_dados_imports(versao):
     try:
-        conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-        df = pd.read_sql_query("SELECT * FROM imports", conn)
-        conn.close()
+        df = pd.read_sql_query("SELECT * FROM imports", conexao_leitura())
         
         df['Data_prevista'] = pd.to_datetime(df['Data_prevista'], format='%d/%m/%Y', errors='coerce')
         df['Ano'] = df['Data_prevista'].dt.year.astype('Int64').astype(str)
@@ -67,7 +41,13 @@ def carregar_dados_imports():
     except Exception as e:
         return pd.DataFrame()
 
-df_imports = carregar_dados_imports()
+@st.cache_data(max_entries=2)
+def carregar_chave_busca_imports(_df, versao):
+    """Chave de busca de cada linha das importações, calculada uma vez por carga."""
+    return chave_busca(_df)
+
+df_imports = carregar_dados_imports(versao_dados('imports'))
+chave_imports = carregar_chave_busca_imports(df_imports, versao_dados('imports'))
 
 if df_imports.empty:
     st.warning("Nenhum dado de importação encontrado. Por favor, importe o arquivo 'imports.xlsx' na página de 'Uploads'.")
@@ -125,17 +105,7 @@ else:
     # --- CAMPO DE PESQUISA (NOVO) ---
     pesquisa = st.text_input("Pesquisar na tabela (separe os termos por vírgula):")
 
-    df_para_exibir = df_filtrado.copy()
-    if pesquisa:
-        termos = [term.strip().lower() for term in pesquisa.split(',') if term.strip()]
-        df_str = df_para_exibir.astype(str).apply(lambda x: x.str.lower())
-        
-        for termo in termos:
-            df_para_exibir = df_para_exibir[df_str.apply(lambda row: row.str.contains(termo, na=False)).any(axis=1)]
-            if not df_para_exibir.empty:
-                 df_str = df_para_exibir.astype(str).apply(lambda x: x.str.lower())
-            else:
-                 break
+    df_para_exibir = df_filtrado[mascara_busca(chave_imports.loc[df_filtrado.index], pesquisa)].copy()
     
     # --- CARDS DE TOTAIS (NOVOS) ---
     st.markdown("##### Resumo da Seleção")
@@ -163,13 +133,4 @@ else:
     df_para_exibir['Data_prevista'] = df_para_exibir['Data_prevista'].dt.strftime('%d/%m/%Y')
     
     colunas_para_exibir = ['nome', 'Data_prevista', 'CodPro', 'Descricao', 'Rolos', 'M2', 'Status_fabrica', 'Recebido', 'reservado']
-    colunas_numericas = ['Rolos', 'M2']
-    
-    formatter = lambda x: formatar_valor(x, decimais=0)
-
-    st.dataframe(
-        df_para_exibir[colunas_para_exibir].style.format(formatter, subset=colunas_numericas)
-                                         .set_properties(**{'text-align': 'right'}, subset=colunas_numericas),
-        width='stretch',
-        hide_index=True
-    )
\ No newline at end of file
+    mostrar_tabela(df_para_exibir[colunas_para_exibir], ['Rolos', 'M2'])
\ No newline at end of file
@@ -1,67 +1,44 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
-import os
 from datetime import datetime
+from db import conexao_leitura, versao_dados
+from busca import SEPARADOR_CHAVE, chave_busca, mascara_busca
+from exibicao import mostrar_tabela
+from auth import verificar_permissao
 
-# --- BLOCO DE CONTROLE DE ACESSO ---
-@st.cache_data(ttl=30)
-def get_user_permissions_from_db(_role):
-    if not _role: return []
-    try:
-        conn = sqlite3.connect("gestor_mkt.db", check_same_thread=False)
-        query = "SELECT page_name FROM permissoes WHERE role = ?"
-        df_perms = pd.read_sql_query(query, conn, params=(_role,))
-        conn.close()
-        return df_perms['page_name'].tolist()
-    except: return []
-
-def check_permission():
-    if not st.session_state.get("authentication_status"):
-        st.error("Acesso negado. Por favor, faça o login.")
-        st.switch_page("app.py")
-        st.stop()
-    page_name = os.path.splitext(os.path.basename(__file__))[0]
-    if st.session_state.get("role") == "Master": return
-    if "permissions" not in st.session_state or st.session_state.permissions is None:
-        st.session_state["permissions"] = get_user_permissions_from_db(st.session_state.get("role"))
-    if page_name not in st.session_state.get("permissions", []):
-        st.error("Você não tem permissão para acessar esta página.")
-        st.stop()
-check_permission()
-# --- FIM DO BLOCO ---
+# --- CONTROLE DE ACESSO ---
+verificar_permissao(__file__)
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(page_title="Saldos", page_icon="⚖️", layout="wide")
 st.title("⚖️ Análise de Saldos (Estoque x Pedidos x Importações)")
 
+# Os caches são invalidados pela versão dos dados; o botão apenas recarrega a página
 if st.button("🔄 Atualizar Dados"):
-    st.cache_data.clear()
     st.toast("Dados atualizados!", icon="✅")
     st.rerun()
 st.markdown("---")
 
 # --- FUNÇÕES E CARREGAMENTO DE DADOS ---
-DB_FILE = "gestor_mkt.db"
-
 def formatar_valor(valor):
     if pd.isna(valor) or not isinstance(valor, (int, float, complex)): return ""
     return f"{valor:,.0f}".replace(",", ".")
 
-@st.cache_data(ttl=600)
-def carregar_dados_base():
+@st.cache_data(max_entries=2)
+def carregar_dados_base(versao):
     try:
-        conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+        conn = conexao_leitura()
         df_produtos = pd.read_sql_query("SELECT codpro, descricao, m2 FROM produtos", conn)
-        df_estoque = pd.read_sql_query("SELECT codpro, qtde, deposito FROM estoque", conn)
+        df_estoque = pd.read_sql_query("SELECT codpro, qtde, rolos, deposito FROM estoque_resumo", conn)
         df_imports = pd.read_sql_query("SELECT CodPro as codpro, Data_prevista, M2, Rolos, Status_fabrica, Recebido, reservado FROM imports", conn)
-        df_pedidos = pd.read_sql_query("SELECT Codpro as codpro, Dt_Entrega, Qt_Vend, Tipo, Num_Ped, Nome_Vend, Nome_Cli FROM pedidos", conn)
-        conn.close()
+        df_pedidos = pd.read_sql_query("SELECT Codpro as codpro, Dt_Entrega, Qt_Vend, Rolos, Tipo, Num_Ped, Nome_Vend, Nome_Cli FROM pedidos", conn)
 
-        df_pedidos = df_pedidos.merge(df_produtos[['codpro', 'm2']], on='codpro', how='left')
-        df_pedidos['m2'] = pd.to_numeric(df_pedidos['m2'], errors='coerce')
+        # Os rolos de pedidos e estoque já vêm gravados nas cargas (o estoque vem totalizado por depósito),
+        # sem arredondar: os saldos somam os valores exatos e só a exibição arredonda para o inteiro
         df_pedidos['Qt_Vend'] = pd.to_numeric(df_pedidos['Qt_Vend'], errors='coerce')
-        df_pedidos['Rolos'] = (df_pedidos['Qt_Vend'] / df_pedidos['m2']).fillna(0).round(0)
+        df_pedidos['Rolos'] = pd.to_numeric(df_pedidos['Rolos'], errors='coerce').fillna(0)
+        df_estoque['qtde'] = pd.to_numeric(df_estoque['qtde'], errors='coerce').fillna(0)
+        df_estoque['qtde_rolos'] = pd.to_numeric(df_estoque['rolos'], errors='coerce').fillna(0)
 
         for df, date_col in [(df_imports, 'Data_prevista'), (df_pedidos, 'Dt_Entrega')]:
             df[date_col] = pd.to_datetime(df[date_col], format='%d/%m/%Y', errors='coerce')
@@ -71,7 +48,21 @@ def carregar_dados_base():
         st.error(f"Erro ao carregar dados base: {e}")
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
-df_produtos_base, df_estoque_base, df_imports_base, df_pedidos_base = carregar_dados_base()
+df_produtos_base, df_estoque_base, df_imports_base, df_pedidos_base = carregar_dados_base(versao_dados('produtos', 'estoque_resumo', 'imports', 'pedidos'))
+
+@st.cache_data(max_entries=2)
+def carregar_detalhe_pedidos(_df_pedidos, _df_produtos, versao):
+    """Pedidos com a descrição do produto e a chave de busca de cada linha, calculadas uma vez por carga."""
+    descricoes = _df_produtos.drop_duplicates('codpro').set_index('codpro')['descricao']
+    df_detalhe = _df_pedidos.assign(descricao=_df_pedidos['codpro'].map(descricoes))
+    return df_detalhe, chave_busca(df_detalhe)
+
+@st.cache_data(max_entries=2)
+def carregar_chave_produtos(_df_produtos, versao):
+    """Chave de busca (código e descrição) por codpro, calculada uma vez por carga dos produtos."""
+    chaves = chave_busca(_df_produtos, ['codpro', 'descricao'])
+    # Um codpro repetido no cadastro casa pela descrição de qualquer uma das linhas
+    return chaves.groupby(_df_produtos['codpro']).agg(SEPARADOR_CHAVE.join)
 
 # --- INÍCIO DA PÁGINA ---
 if df_produtos_base.empty:
@@ -112,9 +103,6 @@ else:
     tabela1 = df_produtos_base[['codpro', 'descricao']].copy().rename(columns={'descricao': 'Produto'})
     col_estoque = 'qtde' if unidade == 'M²' else 'qtde_rolos'
     if not df_estoque_base.empty:
-        df_estoque_base['m2'] = pd.to_numeric(df_estoque_base.merge(df_produtos_base, on='codpro', how='left')['m2'], errors='coerce')
-        df_estoque_base['qtde'] = pd.to_numeric(df_estoque_base['qtde'], errors='coerce').fillna(0)
-        df_estoque_base['qtde_rolos'] = (df_estoque_base['qtde'] / df_estoque_base['m2']).fillna(0).round(0)
         df_estoque_pivot = df_estoque_base.pivot_table(index='codpro', columns='deposito', values=col_estoque, aggfunc='sum')
         tabela1 = tabela1.merge(df_estoque_pivot, on='codpro', how='left')
 
@@ -135,11 +123,13 @@ else:
     tabela1['Saldo'] = tabela1['Total Estoque'] + tabela1['Importação'] - tabela1['Pedidos']
 
     pesquisa1 = st.text_input("Pesquisar na tabela de saldos (separe termos por vírgula):")
-    tabela1_filtrada = tabela1.copy()
+    # Procura no código e na descrição do produto: a chave vem do cache e é alinhada pelo codpro,
+    # sem ser refeita quando só o período ou a unidade mudam
     if pesquisa1:
-        termos = [term.strip().lower() for term in pesquisa1.split(',') if term.strip()]
-        for termo in termos:
-            tabela1_filtrada = tabela1_filtrada[tabela1_filtrada.astype(str).apply(lambda row: row.str.lower().str.contains(termo, na=False)).any(axis=1)]
+        chave_produtos = carregar_chave_produtos(df_produtos_base, versao_dados('produtos'))
+        tabela1_filtrada = tabela1[mascara_busca(tabela1['codpro'].map(chave_produtos).fillna(''), pesquisa1)]
+    else:
+        tabela1_filtrada = tabela1.copy()
 
     st.markdown("---")
     st.subheader("Resumo dos Saldos")
@@ -159,18 +149,15 @@ else:
     st.subheader("Tabela de Saldos Detalhada")
     colunas_tabela1 = ['codpro', 'Produto'] + hubs + ['Total Estoque', 'Importação', 'Pedidos', 'Saldo']
     colunas_numericas1 = hubs + ['Total Estoque', 'Importação', 'Pedidos', 'Saldo']
-    st.dataframe(tabela1_filtrada[colunas_tabela1].style.format(formatar_valor, subset=colunas_numericas1).set_properties(**{'text-align': 'right'}, subset=colunas_numericas1), width='stretch', hide_index=True)
+    mostrar_tabela(tabela1_filtrada[colunas_tabela1], colunas_numericas1)
 
     st.markdown("---")
     st.subheader("Detalhes de Pedidos no Período")
     pesquisa2 = st.text_input("Pesquisar nos detalhes de pedidos (separe termos por vírgula):", key="pesquisa_pedidos")
     
-    df_pedidos_detalhe = df_pedidos_filtrado.merge(df_produtos_base[['codpro', 'descricao']], on='codpro', how='left')
-    
-    if pesquisa2:
-        termos = [term.strip().lower() for term in pesquisa2.split(',') if term.strip()]
-        for termo in termos:
-            df_pedidos_detalhe = df_pedidos_detalhe[df_pedidos_detalhe.astype(str).apply(lambda row: row.str.lower().str.contains(termo, na=False)).any(axis=1)]
+    df_pedidos_detalhe_base, chave_pedidos_detalhe = carregar_detalhe_pedidos(df_pedidos_base, df_produtos_base, versao_dados('produtos', 'pedidos'))
+    df_pedidos_detalhe = df_pedidos_detalhe_base.loc[df_pedidos_filtrado.index]
+    df_pedidos_detalhe = df_pedidos_detalhe[mascara_busca(chave_pedidos_detalhe.loc[df_pedidos_detalhe.index], pesquisa2)].copy()
 
     if not df_pedidos_detalhe.empty:
         df_pedidos_detalhe['Mes'] = df_pedidos_detalhe['Dt_Entrega'].dt.month
@@ -198,11 +185,6 @@ else:
 
         ordem_cols_2 = ['Tipo', 'Pedido', 'Cliente', 'Vendedor', 'codpro', 'Produto'] + meses_na_tabela + ['Total']
         
-        st.dataframe(
-            tabela2_final[ordem_cols_2].style.format(formatar_valor, subset=colunas_numericas2)
-                                        .set_properties(**{'text-align': 'right'}, subset=colunas_numericas2), 
-            width='stretch', 
-            hide_index=True
-        )
+        mostrar_tabela(tabela2_final[ordem_cols_2], colunas_numericas2)
     else:
         st.write("Nenhum detalhe de pedido encontrado para os filtros selecionados.")
\ No newline at end of file
@@ -1,54 +1,12 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
-import numpy as np
-import os
+from db import conexao_leitura, versao_dados
+from esquema import colunas_da_tabela
+from busca import INDICES_BUSCA, clausula_busca
+from auth import verificar_permissao
 
-# --- NOVO BLOCO DE CONTROLE DE ACESSO ---
-@st.cache_data(ttl=30)
-def get_user_permissions_from_db(_role):
-    if not _role: return []
-    try:
-        conn = sqlite3.connect("gestor_mkt.db", check_same_thread=False)
-        query = "SELECT page_name FROM permissoes WHERE role = ?"
-        df_perms = pd.read_sql_query(query, conn, params=(_role,))
-        conn.close()
-        return df_perms['page_name'].tolist()
-    except: return []
-
-def check_permission():
-    if not st.session_state.get("authentication_status"):
-        st.error("Acesso negado. Por favor, faça o login.")
-        st.switch_page("app.py")
-        st.stop()
-
-    # 2. Garante que as permissões estão carregadas na sessão (essencial para reloads de página)
-    if "permissions" not in st.session_state or st.session_state.permissions is None:
-        role = st.session_state.get("role")
-        if not role: # Se o perfil não existir na sessão, busca de novo
-             conn = sqlite3.connect("gestor_mkt.db", check_same_thread=False)
-             username = st.session_state.get("username")
-             df_user = pd.read_sql_query(f"SELECT role FROM usuarios WHERE username = '{username}'", conn)
-             conn.close()
-             if not df_user.empty:
-                 role = df_user.iloc[0]['role']
-                 st.session_state["role"] = role
-        st.session_state["permissions"] = get_user_permissions_from_db(role)
-
-    # 3. Executa a verificação
-    page_name = os.path.splitext(os.path.basename(__file__))[0]
-    
-    # O perfil Master sempre tem acesso
-    if st.session_state.get("role") == "Master":
-        return
-        
-    allowed_pages = st.session_state.get("permissions", [])
-    if page_name not in allowed_pages:
-        st.error("Você não tem permissão para acessar esta página.")
-        st.stop()
-
-check_permission()
-# --- FIM DO BLOCO ---
+# --- CONTROLE DE ACESSO ---
+verificar_permissao(__file__)
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
@@ -61,26 +19,47 @@ st.title("📚 Visualização das Tabelas do Banco de Dados")
 st.write("Aqui você pode visualizar e filtrar os dados de cada tabela importada.")
 
 # --- BOTÃO DE ATUALIZAÇÃO ---
+# Os caches são invalidados pela versão dos dados; o botão apenas recarrega a página
 if st.button("🔄 Atualizar Dados"):
-    st.cache_data.clear()
     st.success("Dados atualizados com sucesso!")
 
 st.markdown("---")
 
-# --- CONEXÃO COM O BANCO DE DADOS ---
-DB_FILE = "gestor_mkt.db"
+# --- CONSULTAS PAGINADAS ---
+# A tabela só é lida quando escolhida, e apenas a página exibida: o filtro e a
+# paginação são feitos no banco (índice de busca ou LIKE + LIMIT/OFFSET), com contagem exata via COUNT.
 
-@st.cache_data(ttl=600)
-def carregar_dados(nome_tabela):
+def montar_filtro(conn, nome_tabela, filtro_texto, todas_colunas):
     """
-    Função para carregar dados de uma tabela específica do banco de dados.
+    Monta a cláusula WHERE (e seus parâmetros) do filtro de texto. Usa o índice de busca
+    da tabela quando existir; senão (ou se pedido), procura o texto em qualquer coluna com LIKE.
     """
+    if not filtro_texto:
+        return "", []
+    if not todas_colunas:
+        filtro_indice = clausula_busca(conn, nome_tabela, filtro_texto)
+        if filtro_indice is not None:
+            clausula, params = filtro_indice
+            return f"WHERE {clausula}", params
+    colunas = colunas_da_tabela(conn, nome_tabela)
+    termo = filtro_texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    condicoes = [f"CAST(\"{coluna}\" AS TEXT) LIKE ? ESCAPE '\\'" for coluna in colunas]
+    return "WHERE " + " OR ".join(condicoes), [f"%{termo}%"] * len(colunas)
+
+@st.cache_data(max_entries=50)
+def contar_registros(nome_tabela, filtro_texto, todas_colunas, versao):
+    conn = conexao_leitura()
+    where, params = montar_filtro(conn, nome_tabela, filtro_texto, todas_colunas)
+    return conn.execute(f"SELECT COUNT(*) FROM {nome_tabela} {where}", params).fetchone()[0]
+
+@st.cache_data(max_entries=50)
+def carregar_pagina(nome_tabela, filtro_texto, todas_colunas, pagina, tamanho_pagina, versao):
+    """Carrega apenas uma página (na ordem de gravação) da tabela, já filtrada."""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        query = f"SELECT * FROM {nome_tabela}"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
+        conn = conexao_leitura()
+        where, params = montar_filtro(conn, nome_tabela, filtro_texto, todas_colunas)
+        query = f"SELECT * FROM {nome_tabela} {where} ORDER BY rowid LIMIT ? OFFSET ?"
+        return pd.read_sql_query(query, conn, params=params + [tamanho_pagina, (pagina - 1) * tamanho_pagina])
     except Exception as e:
         st.error(f"Ocorreu um erro ao carregar a tabela '{nome_tabela}': {e}")
         return pd.DataFrame()
@@ -96,31 +75,35 @@ tabelas = {
     "Tags": "tag"
 }
 
-# --- CRIA UM EXPANDER PARA CADA TABELA ---
-for nome_amigavel, nome_tabela in tabelas.items():
-    with st.expander(f"Visualizar Tabela: {nome_amigavel}", expanded=False):
-        df_tabela = carregar_dados(nome_tabela)
-        
-        if not df_tabela.empty:
-            
-            filtro_texto = st.text_input(
-                f"Filtrar em '{nome_amigavel}'", 
-                key=f"filtro_{nome_tabela}"
-            )
-            
-            df_filtrado = df_tabela.copy()
-            if filtro_texto:
-                df_str = df_tabela.astype(str)
-                mascara = np.column_stack([
-                    df_str[col].str.contains(filtro_texto, case=False, na=False) 
-                    for col in df_str.columns
-                ]).any(axis=1)
-                df_filtrado = df_tabela[mascara]
+# --- SELEÇÃO DA TABELA ---
+col_tabela, col_filtro, col_tamanho = st.columns([2, 4, 1])
+nome_amigavel = col_tabela.selectbox("Tabela", list(tabelas.keys()))
+nome_tabela = tabelas[nome_amigavel]
+filtro_texto = col_filtro.text_input(f"Filtrar em '{nome_amigavel}'", key=f"filtro_{nome_tabela}").strip()
+tamanho_pagina = col_tamanho.selectbox("Linhas por página", [50, 100, 500, 1000], index=1)
+colunas_indexadas = INDICES_BUSCA.get(nome_tabela, (None, []))[1]
+todas_colunas = st.checkbox(
+    "Procurar o texto exato em todas as colunas (mais lento)",
+    help=(f"Por padrão a busca usa o índice textual das colunas {', '.join(colunas_indexadas)}, "
+          "que ignora acentos e casa pelo início das palavras." if colunas_indexadas
+          else "Esta tabela não tem índice textual: a busca sempre procura em todas as colunas.")
+)
+
+versao = versao_dados(nome_tabela)
+tabela_existe = bool(colunas_da_tabela(conexao_leitura(), nome_tabela))
+total_tabela = contar_registros(nome_tabela, "", todas_colunas, versao) if tabela_existe else 0
+total_filtrado = contar_registros(nome_tabela, filtro_texto, todas_colunas, versao) if filtro_texto else total_tabela
+
+if total_tabela == 0:
+    st.warning(f"A tabela '{nome_tabela}' está vazia ou não foi encontrada. "
+               "Verifique se o upload correspondente foi realizado.")
+else:
+    total_paginas = max(1, -(-total_filtrado // tamanho_pagina))
+    pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1, step=1,
+                             key=f"pagina_{nome_tabela}_{filtro_texto}_{todas_colunas}_{tamanho_pagina}")
+    df_pagina = carregar_pagina(nome_tabela, filtro_texto, todas_colunas, int(pagina), tamanho_pagina, versao)
 
-            st.write(f"Exibindo {len(df_filtrado)} de {len(df_tabela)} registros.")
-            
-            st.dataframe(df_filtrado, width='stretch', hide_index=True)
-            
-        else:
-            st.warning(f"A tabela '{nome_tabela}' está vazia ou não foi encontrada. "
-                       "Verifique se o upload correspondente foi realizado.")
\ No newline at end of file
+    inicio = (int(pagina) - 1) * tamanho_pagina
+    st.write(f"Exibindo {inicio + 1 if len(df_pagina) else 0}–{inicio + len(df_pagina)} de {total_filtrado} registros filtrados "
+             f"({total_tabela} no total).")
+    st.dataframe(df_pagina, width='stretch', hide_index=True)
@@ -0,0 +1,91 @@
+from db import incrementar_versao
+
+# --- TABELAS DE RESUMO (PRÉ-AGREGADAS) ---
+# Mantidas pelas cargas da página de Uploads para que os dashboards não precisem
+# agregar as tabelas de itens a cada execução.
+
+def criar_tabelas_resumo(conn):
+    """Cria as tabelas de resumo e seus índices, se ainda não existirem."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vendas_mensal (
+            Ano INTEGER, Mes INTEGER, AnoMes INTEGER, Empresa TEXT, Vend TEXT,
+            Codcli TEXT, Nome_do_Cliente TEXT, Codpro TEXT, UF TEXT,
+            Valor_Total REAL, QtdeFaturada REAL, Rolos REAL, Itens INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vendas_mensal_anomes_empresa ON vendas_mensal (AnoMes, Empresa)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vendas_mensal_codcli ON vendas_mensal (Codcli)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS estoque_resumo (
+            codpro TEXT, deposito TEXT, qtde REAL, rolos REAL,
+            PRIMARY KEY (codpro, deposito)
+        )
+    """)
+    conn.commit()
+
+def atualizar_resumo_vendas(conn, chave_inicio=None, chave_fim=None):
+    """
+    Reconstrói o resumo mensal de vendas (vendas_mensal) a partir da tabela 'vendas'.
+    Com chave_inicio/chave_fim (YYYYMMDD), refaz apenas os meses desse intervalo;
+    sem eles, refaz o resumo inteiro. O m2 vem de uma subconsulta (como em
+    unidades.atualizar_rolos), não de um JOIN: 'produtos' não tem chave única e um
+    codpro repetido multiplicaria as linhas somadas.
+    """
+    criar_tabelas_resumo(conn)
+    if chave_inicio is None or chave_fim is None:
+        filtro_resumo, filtro_vendas, params = "", "WHERE v.Data_NF_chave IS NOT NULL", ()
+    else:
+        filtro_resumo = "WHERE AnoMes BETWEEN ? AND ?"
+        filtro_vendas = "WHERE v.Data_NF_chave BETWEEN ? AND ?"
+        params = (int(chave_inicio) // 100 * 100 + 1, int(chave_fim) // 100 * 100 + 31)
+    conn.execute(f"DELETE FROM vendas_mensal {filtro_resumo}", tuple(p // 100 for p in params))
+    conn.execute(f"""
+        INSERT INTO vendas_mensal
+        SELECT
+            v.Data_NF_chave / 10000, v.Data_NF_chave / 100 % 100, v.Data_NF_chave / 100,
+            v.Empresa, v.Vend, v.Codcli, v.Nome_do_Cliente, v.Codpro, v.UF,
+            SUM(v.Valor_Total), SUM(v.QtdeFaturada),
+            SUM(COALESCE((
+                SELECT v.QtdeFaturada / p.m2 FROM produtos p
+                WHERE p.codpro = v.Codpro AND p.m2 > 0
+                LIMIT 1
+            ), 0)),
+            COUNT(*)
+        FROM vendas v
+        {filtro_vendas}
+        GROUP BY v.Data_NF_chave / 100, v.Empresa, v.Vend, v.Codcli, v.Nome_do_Cliente, v.Codpro, v.UF
+    """, params)
+    conn.commit()
+    incrementar_versao(conn, 'vendas_mensal')
+
+def atualizar_resumo_estoque(conn, deposito=None):
+    """
+    Reconstrói o resumo de estoque (estoque_resumo: total em m² e em rolos por produto e
+    depósito) a partir da tabela 'estoque'. Com 'deposito', refaz apenas esse depósito.
+    Os rolos são somados sem arredondar; o arredondamento fica para a exibição.
+    A remoção e a inserção são gravadas na mesma transação.
+    """
+    criar_tabelas_resumo(conn)
+    filtro, params = ("WHERE deposito = ?", (deposito,)) if deposito is not None else ("", ())
+    conn.execute(f"DELETE FROM estoque_resumo {filtro}", params)
+    conn.execute(f"""
+        INSERT INTO estoque_resumo (codpro, deposito, qtde, rolos)
+        SELECT codpro, deposito, SUM(qtde), SUM(COALESCE(rolos, 0))
+        FROM estoque
+        {filtro}
+        GROUP BY codpro, deposito
+    """, params)
+    conn.commit()
+    incrementar_versao(conn, 'estoque_resumo')
+
+def resumo_vendas_vazio(conn):
+    """Indica se o resumo de vendas precisa ser montado pela primeira vez."""
+    tem_vendas = conn.execute("SELECT EXISTS (SELECT 1 FROM vendas WHERE Data_NF_chave IS NOT NULL)").fetchone()[0]
+    tem_resumo = conn.execute("SELECT EXISTS (SELECT 1 FROM vendas_mensal)").fetchone()[0]
+    return bool(tem_vendas) and not tem_resumo
+
+def resumo_estoque_vazio(conn):
+    """Indica se o resumo de estoque precisa ser montado pela primeira vez."""
+    tem_estoque = conn.execute("SELECT EXISTS (SELECT 1 FROM estoque)").fetchone()[0]
+    tem_resumo = conn.execute("SELECT EXISTS (SELECT 1 FROM estoque_resumo)").fetchone()[0]
+    return bool(tem_estoque) and not tem_resumo
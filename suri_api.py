@@ -0,0 +1,246 @@
+import time
+import pandas as pd
+from datetime import datetime
+from utils import padronizar_telefones
+from esquema import adicionar_chaves_data, aplicar_indices, colunas_da_tabela
+from db import incrementar_versao
+from busca import reconstruir_indice_busca
+from carga import gravar_tabela_em_lotes, atualizar_por_chave, registrar_carga
+
+# --- SINCRONIZAÇÃO DOS CONTATOS DO SURI ---
+# Os contatos são baixados página a página; nenhuma transação fica aberta durante as requisições.
+# - Incremental (padrão): pede os contatos da atividade mais recente para a mais antiga e
+#   para ao alcançar a marca d'água (maior 'lastActivity' da sincronização anterior). Os
+#   contatos novos ou alterados (poucos, só os desde a última sincronização) são gravados
+#   depois da última página, em um único upsert no 'suri_id' junto com o índice de busca.
+# - Completa: baixa todos os contatos, gravando cada página na staging assim que chega (só uma
+#   página fica em memória por vez), e substitui a tabela 'suri' em uma única transação
+#   (ver carga.gravar_tabela_em_lotes). Usada na primeira vez ou quando pedida.
+# As requisições usam uma requests.Session (conexões reaproveitadas) com novas tentativas e
+# espera exponencial em erros 429/5xx, respeitando o cabeçalho Retry-After.
+# Uma reserva na tabela 'sincronizacoes' impede duas sincronizações ao mesmo tempo.
+
+FONTE = "suri"
+CONTATOS_POR_PAGINA = 100
+VALIDADE_RESERVA = 3600  # segundos; uma reserva mais antiga é considerada abandonada
+
+# Esquema gravado na tabela 'suri'
+COLUNAS_SURI = {
+    'suri_id': 'TEXT', 'telefone_suri': 'TEXT', 'Numero': 'TEXT', 'Documento_Identificacao': 'TEXT',
+    'Genero': 'TEXT', 'Id_Canal': 'TEXT', 'Tipo_Canal': 'TEXT', 'Primeiro_Contato': 'TEXT',
+    'Hora_Primeiro_Contato': 'TEXT', 'Ultima_Atividade': 'TEXT', 'Observacao': 'TEXT', 'codcli': 'TEXT',
+    'Nome': 'TEXT', 'Email': 'TEXT', 'Ultimo_Atendente': 'TEXT',
+    'Primeiro_Contato_chave': 'INTEGER', 'Ultima_Atividade_chave': 'INTEGER',
+}
+
+class SincronizacaoEmAndamento(Exception):
+    """Outra sincronização do Suri já está em andamento."""
+
+# --- CLIENTE HTTP ---
+def criar_sessao(token, tentativas=5, espera=1.0):
+    """Session com o token, pool de conexões e novas tentativas com espera exponencial."""
+    # Importados só na sincronização: as páginas e o app usam este módulo sem acessar a API
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    sessao = requests.Session()
+    sessao.headers.update({"Authorization": f"Bearer {token}", "Content-Type": "application/json"})
+    retry = Retry(
+        total=tentativas, backoff_factor=espera,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),  # a listagem de contatos é um POST só de leitura
+        respect_retry_after_header=True,
+    )
+    adaptador = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=4)
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    return sessao
+
+def paginas_de_contatos(sessao, endpoint, channel_id, ordenar_por="dateCreated", ordem="asc"):
+    """Gera as páginas de contatos da API (listas de dicts), seguindo o continuationToken."""
+    url = f"{endpoint.strip('/')}/api/contacts/list"
+    continuation_token = None
+    while True:
+        body = {"orderBy": ordenar_por, "orderType": ordem, "limit": CONTATOS_POR_PAGINA, "channelId": channel_id}
+        if continuation_token:
+            body["continuationToken"] = continuation_token
+        response = sessao.post(url, json=body, timeout=60)
+        response.raise_for_status()
+        data = response.json().get("data", {})
+        contatos, continuation_token = data.get("items", []), data.get("continuationToken")
+        if contatos:
+            yield contatos
+        if not continuation_token:
+            break
+
+def buscar_atendentes(sessao, endpoint):
+    """Mapa id -> nome dos atendentes. Retorna {} se a API não responder."""
+    import requests
+    try:
+        response = sessao.get(f"{endpoint.strip('/')}/api/attendants", timeout=60)
+        response.raise_for_status()
+    except requests.RequestException:
+        return {}
+    return {user['id']: user['name'] for user in response.json().get("data", []) if 'id' in user and 'name' in user}
+
+# --- TRATAMENTO DOS CONTATOS ---
+def separar_cod_e_nome(nome_completo):
+    if isinstance(nome_completo, str) and '|' in nome_completo:
+        partes = nome_completo.split('|', 1)
+        return partes[0].strip(), partes[1].strip()
+    else:
+        nome_original = "" if pd.isna(nome_completo) else str(nome_completo)
+        return None, nome_original.strip()
+
+def tratar_contatos(contatos, atendentes, conn=None):
+    """Converte uma página de contatos da API no DataFrame gravado na tabela 'suri'."""
+    if not contatos:
+        return pd.DataFrame(columns=list(COLUNAS_SURI))
+    df_suri = pd.DataFrame(contatos)
+
+    df_suri['telefone_suri'] = df_suri['phone'] if 'phone' in df_suri.columns else None
+    df_suri['Numero'] = padronizar_telefones(df_suri['telefone_suri'], conn)
+
+    if 'agent' in df_suri.columns and atendentes:
+        df_suri['agent_id'] = df_suri['agent'].apply(lambda a: a.get('platformUserId') if isinstance(a, dict) else None)
+        df_suri['Ultimo_Atendente'] = df_suri['agent_id'].map(atendentes)
+    else:
+        df_suri['Ultimo_Atendente'] = None
+
+    codigos_e_nomes = [separar_cod_e_nome(nome) for nome in df_suri.get('name', [None] * len(df_suri))]
+    df_suri['codcli'] = [codigo for codigo, _ in codigos_e_nomes]
+    df_suri['Nome'] = [nome for _, nome in codigos_e_nomes]
+    map_cols = {'id': 'suri_id', 'gender': 'Genero', 'channelId': 'Id_Canal', 'channelType': 'Tipo_Canal', 'note': 'Observacao', 'email': 'Email', 'dateCreate': 'Primeiro_Contato', 'lastActivity': 'Ultima_Atividade'}
+    df_suri = df_suri.rename(columns=map_cols)
+    for col in ['Primeiro_Contato', 'Ultima_Atividade']:
+        if col not in df_suri.columns:
+            df_suri[col] = None
+
+    for col in ['Primeiro_Contato', 'Ultima_Atividade']:
+        df_suri[col] = pd.to_datetime(df_suri[col], errors='coerce')
+    df_suri['Hora_Primeiro_Contato'] = df_suri['Primeiro_Contato'].dt.strftime('%H:%M:%S')
+    for col in ['Primeiro_Contato', 'Ultima_Atividade']:
+        df_suri[col] = df_suri[col].dt.strftime('%d/%m/%Y')
+    adicionar_chaves_data(df_suri, 'suri')
+
+    df_suri['Documento_Identificacao'] = None
+    return df_suri.reindex(columns=list(COLUNAS_SURI))
+
+def _ultima_atividade(contatos):
+    """Maior 'lastActivity' da página (Timestamp em UTC), ou None."""
+    datas = pd.to_datetime(pd.Series([c.get('lastActivity') for c in contatos], dtype=object), errors='coerce', utc=True)
+    return None if datas.isna().all() else datas.max()
+
+# --- MARCA D'ÁGUA E RESERVA ---
+def criar_tabela_sincronizacoes(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS sincronizacoes (fonte TEXT PRIMARY KEY, marca TEXT, em_andamento REAL, data_hora TEXT)")
+    conn.commit()
+
+def marca_atual(conn, fonte=FONTE):
+    """Marca d'água (Timestamp em UTC) da última sincronização, ou None."""
+    criar_tabela_sincronizacoes(conn)
+    linha = conn.execute("SELECT marca FROM sincronizacoes WHERE fonte = ?", (fonte,)).fetchone()
+    return pd.Timestamp(linha[0]) if linha and linha[0] else None
+
+def _salvar_marca(conn, marca, fonte=FONTE):
+    conn.execute(
+        "UPDATE sincronizacoes SET marca = ?, data_hora = ? WHERE fonte = ?",
+        (marca.isoformat() if marca is not None else None, datetime.now().strftime('%d/%m/%Y %H:%M:%S'), fonte)
+    )
+    conn.commit()
+
+def limpar_marca(conn, fonte=FONTE):
+    """
+    Apaga a marca d'água sem fazer commit, para rodar na mesma transação que substitui a tabela
+    'suri' a partir de um arquivo: os contatos do arquivo não têm 'suri_id', então a próxima
+    sincronização precisa ser completa (um upsert incremental duplicaria os contatos).
+    A tabela 'sincronizacoes' já deve existir (criar_tabela_sincronizacoes).
+    """
+    conn.execute("UPDATE sincronizacoes SET marca = NULL WHERE fonte = ?", (fonte,))
+
+def _reservar(conn, fonte=FONTE):
+    """Reserva a sincronização (UPDATE atômico). Retorna False se outra estiver em andamento."""
+    criar_tabela_sincronizacoes(conn)
+    agora = time.time()
+    conn.execute("INSERT OR IGNORE INTO sincronizacoes (fonte) VALUES (?)", (fonte,))
+    cursor = conn.execute(
+        "UPDATE sincronizacoes SET em_andamento = ? WHERE fonte = ? AND (em_andamento IS NULL OR em_andamento < ?)",
+        (agora, fonte, agora - VALIDADE_RESERVA)
+    )
+    conn.commit()
+    return cursor.rowcount == 1
+
+def _liberar(conn, fonte=FONTE):
+    conn.execute("UPDATE sincronizacoes SET em_andamento = NULL WHERE fonte = ?", (fonte,))
+    conn.commit()
+
+# --- SINCRONIZAÇÃO ---
+def _reindexar(conn):
+    # O índice de busca é refeito na mesma transação que grava os contatos
+    reconstruir_indice_busca(conn, ['suri'])
+
+def sincronizar_contatos(conn, endpoint, token, channel_id, completa=False, progresso=None):
+    """
+    Sincroniza a tabela 'suri' com a API. 'progresso(paginas, contatos)' é chamada a cada página.
+    Retorna um dict com 'modo' ('incremental' ou 'completa'), 'contatos' gravados e 'atendentes'
+    (se os nomes dos atendentes foram obtidos). Lança SincronizacaoEmAndamento se houver outra
+    sincronização em curso e requests.HTTPError se a API falhar após as novas tentativas.
+    """
+    if not _reservar(conn):
+        raise SincronizacaoEmAndamento("Já existe uma sincronização do Suri em andamento.")
+    try:
+        sessao = criar_sessao(token)
+        atendentes = buscar_atendentes(sessao, endpoint)
+        marca = marca_atual(conn)
+        existentes = colunas_da_tabela(conn, 'suri')
+        incremental = not completa and marca is not None and all(coluna in existentes for coluna in COLUNAS_SURI)
+        # A sincronização completa recalcula a marca a partir de todos os contatos
+        estado = {"paginas": 0, "contatos": 0, "marca": marca if incremental else None}
+
+        def registrar_pagina(contatos):
+            estado["paginas"] += 1
+            estado["contatos"] += len(contatos)
+            ultima = _ultima_atividade(contatos)
+            if ultima is not None and (estado["marca"] is None or ultima > estado["marca"]):
+                estado["marca"] = ultima
+            if progresso:
+                progresso(estado["paginas"], estado["contatos"])
+
+        inicio = time.perf_counter()
+        segundos_leitura = 0.0
+        if incremental:
+            paginas = paginas_de_contatos(sessao, endpoint, channel_id, ordenar_por="lastActivity", ordem="desc")
+            alterados = []
+            while True:
+                inicio_pagina = time.perf_counter()
+                contatos = next(paginas, None)
+                segundos_leitura += time.perf_counter() - inicio_pagina
+                if contatos is None:
+                    break
+                datas = pd.to_datetime(pd.Series([c.get('lastActivity') for c in contatos], dtype=object), errors='coerce', utc=True)
+                recentes = [contato for contato, data in zip(contatos, datas) if pd.isna(data) or data >= marca]
+                registrar_pagina(recentes)
+                if recentes:
+                    alterados.append(tratar_contatos(recentes, atendentes, conn))
+                if len(recentes) < len(contatos):
+                    # A página já alcançou contatos sem atividade desde a última sincronização
+                    break
+            if alterados:
+                # Um só upsert, com o índice de busca refeito uma vez na mesma transação
+                # (um contato que mudou de página durante a listagem fica com a versão mais recente)
+                df_alterados = pd.concat(alterados, ignore_index=True).drop_duplicates('suri_id')
+                atualizar_por_chave(conn, 'suri', df_alterados, 'suri_id', _reindexar)
+        else:
+            def lotes():
+                for contatos in paginas_de_contatos(sessao, endpoint, channel_id):
+                    registrar_pagina(contatos)
+                    yield tratar_contatos(contatos, atendentes, conn)
+            _, segundos_leitura = gravar_tabela_em_lotes(conn, 'suri', COLUNAS_SURI, lotes(), na_transacao=_reindexar)
+
+        aplicar_indices(conn, ['suri'])
+        incrementar_versao(conn, 'suri')
+        registrar_carga(conn, "API do Suri", None, 'suri', estado["contatos"], segundos_leitura, time.perf_counter() - inicio - segundos_leitura)
+        _salvar_marca(conn, estado["marca"])
+        return {"modo": "incremental" if incremental else "completa", "contatos": estado["contatos"], "atendentes": bool(atendentes)}
+    finally:
+        _liberar(conn)
@@ -0,0 +1,224 @@
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from db import conexao_escrita, abrir_conexao_escrita, incrementar_versao
+from esquema import adicionar_colunas
+from utils import processo_ativo
+from resumos import atualizar_resumo_vendas, atualizar_resumo_estoque
+from unidades import atualizar_rolos
+from suri_api import sincronizar_contatos
+from ingestao.leitores import tipo_do_arquivo, ler_arquivo
+from ingestao.gravacao import gravar_arquivo, gravar_vendas
+
+# --- TAREFAS EM SEGUNDO PLANO ---
+# Operações longas (cargas de arquivos, sincronização do Suri, reconstrução dos resumos) não
+# rodam na thread do script do Streamlit: a página enfileira a tarefa e acompanha o andamento
+# pela tabela 'tarefas'. Uma thread de trabalho no próprio servidor executa as tarefas uma a
+# uma, na ordem de chegada (o SQLite aceita um único escritor por vez), então a tarefa continua
+# mesmo que o usuário troque de página ou a página seja reexecutada, e não ocupa a thread que
+# renderiza as páginas dos outros usuários.
+# Os parâmetros ficam gravados na tabela; o 'contexto' (conteúdo do arquivo, DataFrame já lido,
+# credenciais) fica só na memória do processo que enfileirou a tarefa. Por isso uma tarefa não
+# sobrevive a um reinício do servidor, nem mesmo se ainda estava na fila: o arquivo precisa ser
+# enviado de novo (ou a sincronização pedida de novo).
+# Cada tarefa registra o processo dono dela ('dono': id do boot da máquina e pid). Ao iniciar a
+# thread de trabalho, as tarefas ativas cujo dono não está mais rodando (processo encerrado ou
+# máquina reiniciada) são marcadas como interrompidas; as de outros processos vivos (outro
+# servidor, a carga pela linha de comando) continuam.
+
+NA_FILA, EXECUTANDO, CONCLUIDA, ERRO = "na_fila", "executando", "concluida", "erro"
+ATIVAS = (NA_FILA, EXECUTANDO)
+ESPERA_PROGRESSO_MS = 200  # uma atualização de progresso que não consegue o lock é descartada
+
+_executor = None
+_trava = threading.Lock()
+_contextos = {}  # id da tarefa -> contexto em memória
+
+def _agora():
+    return datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+
+def criar_tabela_tarefas(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tarefas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT, descricao TEXT, parametros TEXT, usuario TEXT,
+            status TEXT, progresso TEXT, resultado TEXT, erro TEXT,
+            criada_em TEXT, iniciada_em TEXT, concluida_em TEXT, dono TEXT
+        )
+    """)
+    conn.commit()
+    adicionar_colunas(conn, 'tarefas', {'dono': 'TEXT'})  # tabelas criadas antes da coluna
+
+# --- DONO DAS TAREFAS ---
+def _id_boot():
+    """Identificador do boot atual da máquina (Linux); vazio onde não há."""
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+def dono_atual():
+    return f"{_id_boot()}:{os.getpid()}"
+
+def dono_ativo(dono):
+    """Indica se o processo dono de uma tarefa ainda está rodando (o processo atual não conta)."""
+    boot, _, pid = (dono or "").rpartition(":")
+    if not pid.isdigit() or boot != _id_boot() or dono == dono_atual():
+        # Tarefa anterior à coluna 'dono', de outro boot, ou de um processo anterior com o mesmo pid
+        # (este processo ainda não iniciou a thread de trabalho, então nenhuma tarefa é dele)
+        return False
+    return processo_ativo(int(pid))
+
+def marcar_interrompidas(conn):
+    """Marca como erro as tarefas ativas cujo processo dono não está mais rodando. Retorna quantas."""
+    ativas = conn.execute(
+        f"SELECT id, dono FROM tarefas WHERE status IN ({', '.join('?' for _ in ATIVAS)})", ATIVAS
+    ).fetchall()
+    interrompidas = [(id_tarefa,) for id_tarefa, dono in ativas if not dono_ativo(dono)]
+    conn.executemany(
+        "UPDATE tarefas SET status = ?, erro = ?, concluida_em = ? WHERE id = ?",
+        [(ERRO, "Interrompida: o servidor foi reiniciado.", _agora(), id_tarefa) for (id_tarefa,) in interrompidas]
+    )
+    conn.commit()
+    return len(interrompidas)
+
+def _obter_executor():
+    """Cria a thread de trabalho na primeira tarefa do processo."""
+    global _executor
+    with _trava:
+        if _executor is None:
+            conn = conexao_escrita()
+            criar_tabela_tarefas(conn)
+            marcar_interrompidas(conn)
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tarefas")
+        return _executor
+
+def enfileirar(conn, tipo, parametros=None, descricao=None, usuario=None, contexto=None):
+    """
+    Enfileira uma tarefa do tipo informado (ver TIPOS_TAREFA) e retorna o id dela.
+    Se uma tarefa igual (mesmo tipo e parâmetros) já estiver na fila ou em execução, retorna
+    o id dela em vez de criar outra (ex.: dois cliques em "Confirmar").
+    O 'contexto' é passado à função da tarefa e fica só em memória (não sobrevive a um reinício).
+    """
+    if tipo not in TIPOS_TAREFA:
+        raise ValueError(f"Tipo de tarefa desconhecido: '{tipo}'.")
+    executor = _obter_executor()
+    parametros_json = json.dumps(parametros or {}, sort_keys=True, ensure_ascii=False)
+    with _trava:
+        existente = conn.execute(
+            f"SELECT id FROM tarefas WHERE tipo = ? AND parametros = ? AND status IN ({', '.join('?' for _ in ATIVAS)})",
+            (tipo, parametros_json, *ATIVAS)
+        ).fetchone()
+        if existente:
+            return existente[0]
+        cursor = conn.execute(
+            "INSERT INTO tarefas (tipo, descricao, parametros, usuario, status, criada_em, dono) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (tipo, descricao or tipo, parametros_json, usuario, NA_FILA, _agora(), dono_atual())
+        )
+        conn.commit()
+        id_tarefa = cursor.lastrowid
+        _contextos[id_tarefa] = contexto or {}
+    executor.submit(_executar, id_tarefa)
+    return id_tarefa
+
+def _executar(id_tarefa):
+    conn = conexao_escrita()  # conexão da thread de trabalho
+    tipo, parametros = conn.execute("SELECT tipo, parametros FROM tarefas WHERE id = ?", (id_tarefa,)).fetchone()
+    conn.execute("UPDATE tarefas SET status = ?, iniciada_em = ? WHERE id = ?", (EXECUTANDO, _agora(), id_tarefa))
+    conn.commit()
+    contexto = _contextos.pop(id_tarefa, {})
+    # O progresso é gravado em outra conexão: um commit dele na conexão da tarefa
+    # confirmaria no meio a transação que a tarefa estiver fazendo
+    conn_progresso = abrir_conexao_escrita()
+    conn_progresso.execute(f"PRAGMA busy_timeout = {ESPERA_PROGRESSO_MS}")
+
+    def progresso(texto):
+        try:
+            atualizar_progresso(conn_progresso, id_tarefa, texto)
+        except sqlite3.OperationalError:
+            # Banco travado pela própria tarefa (ou outra escrita): o progresso é só informativo
+            conn_progresso.rollback()
+
+    try:
+        resultado = TIPOS_TAREFA[tipo](conn, json.loads(parametros), progresso, **contexto)
+        conn.execute(
+            "UPDATE tarefas SET status = ?, resultado = ?, concluida_em = ? WHERE id = ?",
+            (CONCLUIDA, resultado, _agora(), id_tarefa)
+        )
+    except Exception as e:
+        conn.rollback()
+        conn.execute("UPDATE tarefas SET status = ?, erro = ?, concluida_em = ? WHERE id = ?", (ERRO, str(e), _agora(), id_tarefa))
+    finally:
+        conn_progresso.close()
+    conn.commit()
+
+def atualizar_progresso(conn, id_tarefa, texto):
+    conn.execute("UPDATE tarefas SET progresso = ? WHERE id = ?", (texto, id_tarefa))
+    conn.commit()
+
+def consultar_tarefa(conn, id_tarefa):
+    """Dados da tarefa (dict com status, progresso, resultado, erro...), ou None."""
+    df = pd.read_sql_query("SELECT * FROM tarefas WHERE id = ?", conn, params=(id_tarefa,))
+    return None if df.empty else df.iloc[0].to_dict()
+
+def tarefas_recentes(conn, tipos=None, limite=10):
+    """Últimas tarefas (dos tipos informados, ou de todos), da mais recente para a mais antiga."""
+    filtro, params = "", []
+    if tipos:
+        filtro = f"WHERE tipo IN ({', '.join('?' for _ in tipos)})"
+        params = list(tipos)
+    return pd.read_sql_query(
+        f"SELECT id, descricao, usuario, status, progresso, resultado, erro, criada_em, concluida_em FROM tarefas {filtro} ORDER BY id DESC LIMIT ?",
+        conn, params=params + [limite]
+    )
+
+# --- TIPOS DE TAREFA ---
+# Cada tipo recebe (conn, parametros, progresso, **contexto) e retorna o texto do resultado.
+
+def _carga_arquivo(conn, parametros, progresso, conteudo=None, df=None, segundos_leitura=0.0):
+    """Grava um arquivo enviado pela página de Uploads (o DataFrame da prévia, se houver)."""
+    nome, hash_conteudo = parametros["nome"], parametros.get("hash")
+    if tipo_do_arquivo(nome) in ("vendas_mes", "historico_vendas"):
+        progresso("Gravando as vendas em lotes...")
+        linhas, _, _ = gravar_vendas(conn, [(nome, conteudo)], hash_conteudo)
+    else:
+        if df is None:
+            progresso("Lendo o arquivo...")
+            inicio = time.perf_counter()
+            df = ler_arquivo(io.BytesIO(conteudo), nome, conn)
+            segundos_leitura = time.perf_counter() - inicio
+        progresso("Gravando no banco...")
+        linhas = gravar_arquivo(conn, nome, df, hash_conteudo, segundos_leitura)
+    return f"{linhas} linhas gravadas"
+
+def _sincronizar_suri(conn, parametros, progresso, endpoint=None, token=None, channel_id=None):
+    resultado = sincronizar_contatos(
+        conn, endpoint, token, channel_id, completa=parametros.get("completa", False),
+        progresso=lambda paginas, contatos: progresso(f"Página {paginas}: {contatos} contatos salvos")
+    )
+    aviso = "" if resultado["atendentes"] else " (sem os nomes dos atendentes)"
+    return f"Importação {resultado['modo']}: {resultado['contatos']} contatos salvos{aviso}"
+
+def _refazer_resumos(conn, parametros, progresso):
+    """Recalcula os rolos de estoque e pedidos e os resumos de vendas e estoque."""
+    progresso("Recalculando os rolos...")
+    atualizar_rolos(conn)
+    progresso("Refazendo o resumo de vendas...")
+    atualizar_resumo_vendas(conn)
+    progresso("Refazendo o resumo de estoque...")
+    atualizar_resumo_estoque(conn)
+    incrementar_versao(conn, 'pedidos', 'estoque')
+    return "Resumos refeitos"
+
+TIPOS_TAREFA = {
+    "carga_arquivo": _carga_arquivo,
+    "sincronizar_suri": _sincronizar_suri,
+    "refazer_resumos": _refazer_resumos,
+}
@@ -0,0 +1,92 @@
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+# --- TEMPO DE IMPORTAÇÃO DO APP E DAS PÁGINAS ---
+# Relatório do custo de inicialização: para o app.py e cada página, executa os imports do
+# topo do arquivo em um processo Python novo (como num reinício do container) com
+# '-X importtime' e mostra o tempo total, os módulos mais caros e quais dependências pesadas
+# foram carregadas. Essas dependências devem ser importadas só nas funções que as usam.
+# Uso: python tempo_inicio.py [--repeticoes 3] [arquivo.py ...]
+# O pytest (tests/test_tempo_inicio.py) sempre verifica que nenhum arquivo carrega uma
+# dependência pesada fora de PESADOS_ACEITOS. A medição de tempo depende da máquina e só roda
+# quando pedida, com o limite em ms na variável de ambiente GESTOR_LIMITE_IMPORTACAO_MS.
+
+PESADOS = ("phonenumbers", "requests", "xlsxwriter", "openpyxl", "xlrd", "bcrypt")
+
+# Pesados aceitos por arquivo: o streamlit_authenticator do app.py importa requests e bcrypt
+PESADOS_ACEITOS = {"app.py": ("requests", "bcrypt")}
+
+def imports_do_arquivo(caminho):
+    """Instruções de import do nível superior do arquivo, como código-fonte."""
+    with open(caminho, encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+    return [ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom))]
+
+def medir_imports(codigo, raiz):
+    """
+    Executa 'codigo' em um processo novo com '-X importtime'.
+    Retorna ({módulo importado diretamente: microssegundos acumulados}, nomes de todos os módulos carregados).
+    """
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=raiz, capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.strip().splitlines()[-1])
+    diretos, carregados = {}, set()
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:"):
+            continue
+        _, acumulado, nome = linha[len("import time:"):].split("|")
+        if not acumulado.strip().isdigit():
+            continue  # cabeçalho
+        carregados.add(nome.strip())
+        # Módulos sem recuo foram importados diretamente; o tempo acumulado já inclui as dependências
+        if nome[1:2] != " ":
+            diretos[nome.strip()] = int(acumulado)
+    return diretos, carregados
+
+def medir_arquivo(arquivo, raiz, repeticoes=3):
+    """
+    Mede os imports do topo de 'arquivo'. Retorna (mediana do total em ms, pesados carregados,
+    [(módulo, ms)] dos módulos importados diretamente mais caros).
+    """
+    codigo = "\n".join(imports_do_arquivo(os.path.join(raiz, arquivo)))
+    medicoes = [medir_imports(codigo, raiz) for _ in range(repeticoes)]
+    total = statistics.median(sum(diretos.values()) for diretos, _ in medicoes) / 1000
+    diretos, carregados = medicoes[-1]
+    pesados = [modulo for modulo in PESADOS if modulo in carregados]
+    caros = sorted(((modulo, tempo / 1000) for modulo, tempo in diretos.items()), key=lambda item: item[1], reverse=True)[:4]
+    return total, pesados, caros
+
+def pesados_carregados(arquivo, raiz):
+    """Dependências pesadas (PESADOS) carregadas pelos imports do topo de 'arquivo'."""
+    _, carregados = medir_imports("\n".join(imports_do_arquivo(os.path.join(raiz, arquivo))), raiz)
+    return [modulo for modulo in PESADOS if modulo in carregados]
+
+def arquivos_do_app(raiz):
+    """app.py e as páginas, na ordem do menu."""
+    paginas = [nome for nome in os.listdir(os.path.join(raiz, "pages")) if nome.endswith(".py")]
+    return ["app.py"] + [os.path.join("pages", nome) for nome in sorted(paginas, key=lambda nome: int(nome.split("_")[0]))]
+
+def relatorio(arquivos, raiz, repeticoes):
+    print(f"{'arquivo':<28} {'ms':>8}  pesados carregados / módulos mais caros")
+    for arquivo in arquivos:
+        total, pesados, caros = medir_arquivo(arquivo, raiz, repeticoes)
+        print(f"{arquivo:<28} {total:>8.0f}  {', '.join(pesados) or '-'}")
+        print(f"{'':<38}{', '.join(f'{modulo} {tempo:.0f}ms' for modulo, tempo in caros)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o tempo de importação do app e das páginas.")
+    parser.add_argument("arquivos", nargs="*", help="Arquivos a medir (padrão: app.py e todas as páginas)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por arquivo (usa a mediana)")
+    args = parser.parse_args()
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    relatorio(args.arquivos or arquivos_do_app(raiz), raiz, args.repeticoes)
+
+if __name__ == "__main__":
+    main()
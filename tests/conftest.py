@@ -0,0 +1,14 @@
+import pytest
+import db
+from migracoes import preparar_banco
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    """Conexão de escrita de um banco novo, com as migrações aplicadas, em um diretório temporário."""
+    # As conexões do pool ficariam apontando para o banco do teste anterior
+    db.fechar_conexoes()
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "gestor_mkt.db"))
+    conexao = db.conexao_escrita()
+    preparar_banco(conexao)
+    yield conexao
+    db.fechar_conexoes()
@@ -0,0 +1,69 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- SERVIDOR LOCAL QUE IMITA A API DO SURI ---
+# Atende /api/contacts/list (POST, paginado pelo continuationToken e ordenado pelo 'orderBy'
+# pedido, incluindo lastActivity desc) e /api/attendants (GET). 'falhas' é uma lista de
+# status HTTP devolvidos, um por requisição, antes das respostas normais da listagem.
+# 'ao_listar', se definida, é chamada a cada listagem, antes da resposta.
+
+def contato(i, ultima_atividade):
+    return {
+        "id": f"c{i}", "name": f"{i}|Cliente {i}" if i % 3 else f"Pessoa {i}", "phone": f"55119{i:08d}",
+        "email": f"c{i}@exemplo.com", "gender": "M", "channelId": "canal", "channelType": "whatsapp", "note": None,
+        "dateCreate": f"2025-01-{1 + i % 28:02d}T10:00:00Z", "lastActivity": ultima_atividade,
+        "agent": {"platformUserId": "a1"},
+    }
+
+class ServidorSuri:
+    def __init__(self, contatos):
+        self.contatos = contatos
+        self.falhas = []
+        self.listagens = 0  # requisições de listagem respondidas com sucesso
+        self.erros = 0
+        self.ao_listar = None
+        servidor = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, corpo, cabecalhos=None):
+                dados = json.dumps(corpo).encode()
+                self.send_response(status)
+                for chave, valor in (cabecalhos or {}).items():
+                    self.send_header(chave, valor)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_GET(self):
+                if self.path == "/api/attendants":
+                    return self._responder(200, {"data": [{"id": "a1", "name": "Ana"}]})
+                self._responder(404, {})
+
+            def do_POST(self):
+                corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if self.path != "/api/contacts/list":
+                    return self._responder(404, {})
+                if servidor.falhas:
+                    servidor.erros += 1
+                    return self._responder(servidor.falhas.pop(0), {"erro": "falha simulada"}, {"Retry-After": "0"})
+                servidor.listagens += 1
+                if servidor.ao_listar:
+                    servidor.ao_listar()
+                campo = {"lastActivity": "lastActivity", "dateCreated": "dateCreate"}[corpo["orderBy"]]
+                itens = sorted(servidor.contatos, key=lambda c: (c[campo], c["id"]), reverse=corpo["orderType"] == "desc")
+                inicio = int(corpo.get("continuationToken") or 0)
+                fim = inicio + corpo["limit"]
+                self._responder(200, {"data": {"items": itens[inicio:fim], "continuationToken": str(fim) if fim < len(itens) else None}})
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Tratador)
+        self.endpoint = f"http://127.0.0.1:{self._http.server_address[1]}"
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+
+    def encerrar(self):
+        self._http.shutdown()
+        self._http.server_close()
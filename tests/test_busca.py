@@ -0,0 +1,57 @@
+import sqlite3
+import pandas as pd
+import db
+import ingestao.gravacao as gravacao
+from busca import buscar_chaves, indice_existe, migrar_indice_busca
+
+def _clientes(nomes):
+    return pd.DataFrame({
+        "Codigo": [str(i) for i in range(len(nomes))], "Nome": nomes,
+        "Cidade": ["Porto Alegre"] * len(nomes), "Email": [f"c{i}@exemplo.com" for i in range(len(nomes))],
+    })
+
+def test_indice_de_busca_trocado_junto_com_a_tabela(conn, monkeypatch):
+    gravacao.gravar_arquivo(conn, "clientes.csv", _clientes(["Ana Souza", "Bruno Lima"]))
+    outra = sqlite3.connect(db.DB_FILE)
+    vistas = []
+    corrigir = gravacao.corrigir_esquema
+
+    def corrigir_e_buscar(conn, tabelas=None):
+        # Logo após o COMMIT da troca, antes de qualquer outro passo da carga
+        vistas.append(buscar_chaves(outra, "clientes", "carla"))
+        corrigir(conn, tabelas)
+    monkeypatch.setattr(gravacao, "corrigir_esquema", corrigir_e_buscar)
+
+    gravacao.gravar_arquivo(conn, "clientes.csv", _clientes(["Bruno Lima", "Carla Dias", "Ana Souza"]))
+
+    assert vistas == [{"1"}]
+    assert buscar_chaves(outra, "clientes", "ana") == {"2"}
+
+def test_carga_sem_coluna_indexada_nao_deixa_indice_antigo(conn):
+    gravacao.gravar_arquivo(conn, "clientes.csv", _clientes(["Ana Souza", "Bruno Lima"]))
+
+    gravacao.gravar_arquivo(conn, "clientes.csv", _clientes(["Carla Dias"]).drop(columns="Cidade"))
+
+    # Sem índice as páginas usam a busca por texto; o índice antigo apontaria para linhas trocadas
+    assert not indice_existe(conn, "clientes")
+    assert buscar_chaves(conn, "clientes", "carla") is None
+
+def test_busca_restrita_a_colunas_do_indice(conn):
+    gravacao.gravar_arquivo(conn, "clientes.csv", _clientes(["Ana Porto", "Bruno Lima"]))
+
+    assert buscar_chaves(conn, "clientes", "porto") == {"0", "1"}
+    assert buscar_chaves(conn, "clientes", "porto", ["Nome"]) == {"0"}
+
+def test_indice_com_colunas_antigas_e_refeito(conn):
+    gravacao.gravar_arquivo(conn, "pedidos_cd.xls", pd.DataFrame({
+        "Num_Ped": ["10"], "Num_Ped_Web": [""], "OC": [""], "Codcli": ["7"], "Nome_Cli": ["Ana"],
+        "Codpro": ["123"], "Descricao_Produto": ["Lona fosca"], "Nome_Vend": ["Bruno"],
+    }))
+    conn.execute("DROP TABLE busca_pedidos")
+    conn.execute("CREATE VIRTUAL TABLE busca_pedidos USING fts5(Num_Ped, Nome_Cli, content='pedidos', content_rowid='rowid')")
+    conn.commit()
+
+    migrar_indice_busca(conn)
+
+    assert buscar_chaves(conn, "pedidos", "lona") == {"10"}
+    assert buscar_chaves(conn, "pedidos", "123") == {"10"}
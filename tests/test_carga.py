@@ -0,0 +1,38 @@
+import subprocess
+import sys
+import pandas as pd
+import db
+from carga import _nome_staging, gravar_tabela, gravar_tabela_em_lotes, limpar_stagings
+from esquema import colunas_da_tabela
+
+def _stagings(conn):
+    return sorted(linha[0] for linha in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'carga\\_%' ESCAPE '\\'"))
+
+def test_cargas_simultaneas_da_mesma_tabela(conn):
+    outra = db.abrir_conexao_escrita()
+
+    def lotes():
+        yield pd.DataFrame({"codpro": ["1"], "descricao": ["Lona"]})
+        # Outra carga da mesma tabela enquanto esta ainda grava a staging
+        gravar_tabela(outra, "produtos", pd.DataFrame({"codpro": ["9"], "descricao": ["Vinil"]}))
+        yield pd.DataFrame({"codpro": ["2"], "descricao": ["Adesivo"]})
+
+    linhas, _ = gravar_tabela_em_lotes(conn, "produtos", {"codpro": "TEXT", "descricao": "TEXT"}, lotes())
+    outra.close()
+
+    assert linhas == 2
+    assert conn.execute("SELECT codpro FROM produtos ORDER BY codpro").fetchall() == [("1",), ("2",)]
+    assert _stagings(conn) == []
+
+def test_limpar_stagings_so_de_processos_encerrados(conn):
+    encerrado = subprocess.Popen([sys.executable, "-c", "pass"])
+    encerrado.wait()
+    deste_processo = _nome_staging("produtos")
+    abandonada = f"carga_produtos_{encerrado.pid}_0123abcd"
+    for nome in (deste_processo, abandonada, "carga_estoque"):
+        conn.execute(f"CREATE TABLE {nome} (codpro TEXT)")
+    conn.commit()
+
+    assert limpar_stagings(conn) == 2
+    assert _stagings(conn) == [deste_processo]
+    assert colunas_da_tabela(conn, "produtos")
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from contatos import primeira_correspondencia, buscar_por_telefones
+from esquema import aplicar_indices
+
+CONTATOS = pd.DataFrame({
+    "telefone_suri": ["5511999990001", None, "N/A"],
+    "Numero": ["5511999990001", "5511999990002", "5511999990003"],
+}, index=[10, 20, 30])
+
+def test_primeira_correspondencia_com_coluna_de_telefone_inteira():
+    clientes = pd.DataFrame({"Codigo": [1, 2, 3], "Fone": np.array([5511999990002, 5511999990001, 5511999990001], dtype="int64")})
+
+    resultado = primeira_correspondencia(CONTATOS, ["telefone_suri", "Numero"], clientes, "Fone")
+
+    assert resultado["Codigo"].tolist()[:2] == [2, 1]
+    assert pd.isna(resultado.loc[30, "Codigo"])
+    assert list(resultado.columns) == ["Codigo", "Fone"]
+
+def test_correspondencias_com_coluna_de_telefone_float_e_vazios():
+    rd = pd.DataFrame({"CodigoCliente": ["a", "b", "c"], "Celular": [5511999990003.0, np.nan, 5511999990001.0]})
+
+    primeira = primeira_correspondencia(CONTATOS, ["telefone_suri", "Numero"], rd, "Celular")
+
+    assert primeira["CodigoCliente"].fillna("-").tolist() == ["c", "-", "a"]
+
+def test_buscar_por_telefones_usa_o_indice_com_coluna_inteira(conn):
+    clientes = pd.DataFrame({"Codigo": [1, 2, 3], "Nome": ["A", "B", "C"], "Fone": np.array([5511999990002, 5511999990001, 5511999990003], dtype="int64")})
+    clientes.to_sql("clientes", conn, index=False, if_exists="replace")
+    aplicar_indices(conn, ["clientes"])
+
+    encontrados = buscar_por_telefones(conn, "clientes", "Fone", ["5511999990001", "5511999990002", "N/A"])
+
+    assert encontrados["Codigo"].tolist() == [1, 2]
+    plano = conn.execute('EXPLAIN QUERY PLAN SELECT * FROM clientes WHERE "Fone" IN (?, ?) ORDER BY rowid', ("1", "2")).fetchall()
+    assert any("idx_clientes_fone" in linha[-1] for linha in plano)
+    assert buscar_por_telefones(conn, "clientes", "Fone", ["N/A"]).empty
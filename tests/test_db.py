@@ -0,0 +1,38 @@
+import threading
+import db
+
+def _em_outra_thread(funcao):
+    resultado = []
+    thread = threading.Thread(target=lambda: resultado.append(funcao()))
+    thread.start()
+    thread.join()
+    return resultado[0]
+
+def test_conexoes_voltam_ao_pool_quando_a_thread_termina(conn):
+    # Cada reexecução do Streamlit roda em uma thread nova
+    primeira = _em_outra_thread(db.conexao_leitura)
+    segunda = _em_outra_thread(db.conexao_leitura)
+
+    assert segunda is primeira
+    assert segunda.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 1
+
+def test_pool_guarda_um_numero_limitado_de_conexoes(conn):
+    barreira = threading.Barrier(db.OCIOSAS_POR_TIPO + 3)
+    threads = [threading.Thread(target=lambda: (db.conexao_leitura(), barreira.wait())) for _ in range(db.OCIOSAS_POR_TIPO + 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(db._ociosas[True]) == db.OCIOSAS_POR_TIPO
+
+def test_transacao_deixada_aberta_e_desfeita_na_devolucao(conn):
+    def escrever_sem_commit():
+        escrita = db.conexao_escrita()
+        escrita.execute("INSERT INTO versoes_dados (tabela, versao) VALUES ('teste', 1)")
+        return escrita
+
+    escrita = _em_outra_thread(escrever_sem_commit)
+
+    assert not escrita.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM versoes_dados WHERE tabela = 'teste'").fetchone()[0] == 0
@@ -0,0 +1,17 @@
+import pandas as pd
+import exibicao
+
+def test_formato_com_milhares_em_ponto():
+    assert exibicao.formato_numero() == "%'.,.0f"
+    assert exibicao.formato_numero(moeda=True) == "R$ %'.,.0f"
+
+def test_mostrar_tabela_envia_as_colunas_numericas_como_numeros(monkeypatch):
+    enviados = {}
+    monkeypatch.setattr(exibicao.st, "dataframe", lambda df, **opcoes: enviados.update(df=df, **opcoes))
+    df = pd.DataFrame({"Produto": ["A", "B", "C"], "Total": [900.0, 1000.0, 12.5]})
+
+    exibicao.mostrar_tabela(df, ["Total", "Ausente"], moeda=True)
+
+    assert enviados["df"] is df  # sem cópia formatada em texto: a grade ordena pelos números
+    assert list(enviados["column_config"]) == ["Total"]
+    assert enviados["column_config"]["Total"]["type_config"]["format"] == "R$ %'.,.0f"
@@ -0,0 +1,33 @@
+import ingestao.lote as lote
+from utils import criar_tabela_telefones
+
+CABECALHO_CLIENTES = "Código;Nome;Tipo Pessoa;E-mail;Estado;Cidade;Fone;Segmento;Vendedor;Representante;Situação;Tipo Fiscal;Papéis;Tag's\n"
+
+def _criar_clientes(pasta):
+    caminho = str(pasta / "clientes.csv")
+    with open(caminho, "w", encoding="utf-8-sig") as f:
+        f.write(CABECALHO_CLIENTES)
+        f.write("0101;Ana;1;ana@exemplo.com;SP;Campinas;+1 650 253 0000;;;;A;;Cliente;\n")
+    return caminho
+
+def _telefones_gravados(conn):
+    return conn.execute("SELECT bruto, padronizado FROM telefones_normalizados").fetchall()
+
+def test_leitura_em_processo_so_consulta_o_banco(conn, tmp_path):
+    criar_tabela_telefones(conn)
+    conn.commit()
+
+    df, _, _, telefones_novos = lote.ler_em_processo(_criar_clientes(tmp_path))
+
+    assert df['Fone'].tolist() == ["16502530000"]
+    assert telefones_novos == {"+1 650 253 0000": "16502530000"}
+    assert _telefones_gravados(conn) == []
+
+def test_carga_grava_os_telefones_lidos_pelos_processos(conn, tmp_path, monkeypatch):
+    # Os processos de leitura abrem o gestor_mkt.db da pasta atual, o mesmo banco do teste
+    monkeypatch.chdir(tmp_path)
+
+    assert lote.carregar_arquivos([_criar_clientes(tmp_path)]) == [str(tmp_path / "clientes.csv")]
+
+    assert _telefones_gravados(conn) == [("+1 650 253 0000", "16502530000")]
+    assert conn.execute("SELECT Fone FROM clientes").fetchall() == [("16502530000",)]
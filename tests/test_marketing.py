@@ -0,0 +1,34 @@
+from marketing import calcular_kpis_marketing
+
+def _inserir(conn, tabela, linhas):
+    colunas = list(linhas[0])
+    conn.executemany(
+        f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' for _ in colunas)})",
+        [tuple(linha[coluna] for coluna in colunas) for linha in linhas],
+    )
+
+def _venda(codcli, anomes, valor):
+    return {"AnoMes": anomes, "Empresa": "1", "Codcli": codcli, "Valor_Total": valor}
+
+def test_kpis_contam_cada_cliente_uma_vez_por_canal(conn):
+    _inserir(conn, "clientes", [
+        {"Codigo": "1", "Nome": "Qualificado", "Tags": "#673AB4"},
+        {"Codigo": "2", "Nome": "Direcionado", "Tags": "#673AB1"},
+        {"Codigo": "3", "Nome": "Só Suri", "Tags": ""},
+    ])
+    # O cliente 1 tem dois números no Suri: suas vendas e pedidos contam uma vez
+    _inserir(conn, "suri", [{"suri_id": "a", "codcli": "1"}, {"suri_id": "b", "codcli": "1"}, {"suri_id": "c", "codcli": "3"}])
+    _inserir(conn, "vendas_mensal", [
+        _venda("1", 202504, 200.0), _venda("1", 202505, 1000.0), _venda("2", 202505, 300.0), _venda("3", 202505, 500.0),
+    ])
+    _inserir(conn, "pedidos", [{"Codcli": "1", "Empresa": "1", "Dt_Entrega_chave": 20250510, "Qt_Vend": 2, "Vlr_Unit": 100.0, "Vlr_Liquido": 180.0}])
+    conn.commit()
+
+    kpis = calcular_kpis_marketing(conn, 2025, [5], "Todos")
+
+    assert (kpis.suri.total_vendas, kpis.suri.total_pedidos) == (1500.0, 200.0)
+    assert (kpis.sdr.total_vendas, kpis.sdr.total_pedidos) == (1300.0, 180.0)
+    # Suri: compraram em maio sem ter comprado nos 3 meses anteriores (o cliente 1 comprou em abril)
+    assert kpis.suri.clientes_reativados == 1
+    # SDR: clientes qualificados que compraram no período, como no dashboard original
+    assert kpis.sdr.clientes_reativados == 1
@@ -0,0 +1,36 @@
+import os
+import ingestao.lote as lote
+import ingestao.observador as observador
+
+def _criar(pasta, nome, conteudo="x"):
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, "w") as f:
+        f.write(conteudo)
+    return caminho
+
+def test_historico_alterado_recarrega_o_mes_atual(conn, tmp_path, monkeypatch):
+    pasta = str(tmp_path / "dados")
+    os.mkdir(pasta)
+    historico1 = _criar(pasta, "lucratividade_1.txt")
+    historico2 = _criar(pasta, "lucratividade_2.txt")
+    vendas = _criar(pasta, "vendas.txt")
+    cargas = []
+    monkeypatch.setattr(observador, "carregar_arquivos", lambda caminhos, processos=None: cargas.append(sorted(caminhos)) or caminhos)
+
+    anteriores = {}
+    observador.verificar_pasta(pasta, anteriores)
+    observador.verificar_pasta(pasta, anteriores)  # estáveis: primeira carga
+    _criar(pasta, "lucratividade_1.txt", "novo conteúdo")
+    observador.verificar_pasta(pasta, anteriores)
+    observador.verificar_pasta(pasta, anteriores)
+
+    assert cargas == [sorted([historico1, historico2, vendas])] * 2
+
+def test_carga_grava_o_historico_antes_do_mes_atual(conn, tmp_path, monkeypatch):
+    gravacoes = []
+    monkeypatch.setattr(lote, "gravar_vendas", lambda conn, pares, hash_conteudo: gravacoes.append([nome for nome, _ in pares]) or (0, 0.0, 0.0))
+    caminhos = [_criar(str(tmp_path), nome) for nome in ("vendas.txt", "lucratividade_2.txt", "lucratividade_1.txt")]
+
+    lote.carregar_arquivos(caminhos)
+
+    assert gravacoes == [["lucratividade_2.txt", "lucratividade_1.txt"], ["vendas.txt"]]
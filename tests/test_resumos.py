@@ -0,0 +1,29 @@
+from resumos import atualizar_resumo_estoque, atualizar_resumo_vendas
+
+def test_resumo_de_estoque_soma_os_rolos_sem_arredondar(conn):
+    # Três itens de 0,4 rolo: arredondados um a um somariam 0
+    conn.executemany(
+        "INSERT INTO estoque (codpro, produto, qtde, deposito, rolos) VALUES (?, ?, ?, ?, ?)",
+        [("10", "Produto", 12, "hub1", 0.4)] * 3 + [("10", "Produto", 45, "hub3", 1.5)],
+    )
+    conn.commit()
+
+    atualizar_resumo_estoque(conn)
+
+    linhas = conn.execute("SELECT deposito, qtde, rolos FROM estoque_resumo ORDER BY deposito").fetchall()
+    assert [(deposito, qtde, round(rolos, 6)) for deposito, qtde, rolos in linhas] == [("hub1", 36, 1.2), ("hub3", 45, 1.5)]
+
+def test_resumo_de_vendas_com_produto_repetido_nao_multiplica_as_vendas(conn):
+    # A carga de produtos troca a tabela pela staging do to_sql, que não tem chave primária
+    conn.execute("DROP TABLE produtos")
+    conn.execute("CREATE TABLE produtos (codpro TEXT, descricao TEXT, m2 REAL)")
+    conn.executemany("INSERT INTO produtos VALUES (?, ?, ?)", [("10", "Produto", 50.0), ("10", "Produto", 50.0)])
+    conn.executemany(
+        "INSERT INTO vendas (Data_NF_chave, Empresa, Vend, Codcli, Nome_do_Cliente, Codpro, UF, Valor_Total, QtdeFaturada) VALUES (?, '1', '7', '1', 'Cliente', '10', 'RS', ?, ?)",
+        [(20250105, 1000.0, 100.0), (20250120, 500.0, 25.0)],
+    )
+    conn.commit()
+
+    atualizar_resumo_vendas(conn)
+
+    assert conn.execute("SELECT AnoMes, Valor_Total, QtdeFaturada, Rolos, Itens FROM vendas_mensal").fetchall() == [(202501, 1500.0, 125.0, 2.5, 2)]
@@ -0,0 +1,131 @@
+import functools
+import sqlite3
+import pandas as pd
+import pytest
+import db
+import suri_api
+from busca import buscar_chaves
+from ingestao.gravacao import gravar_arquivo
+from servidor_suri import ServidorSuri, contato
+
+TOTAL = 250  # 3 páginas de CONTATOS_POR_PAGINA
+
+def _atividade(i):
+    inicio = pd.Timestamp("2025-06-01T00:00:00Z")
+    return (inicio + pd.Timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorSuri([contato(i, _atividade(i)) for i in range(TOTAL)])
+    yield servidor
+    servidor.encerrar()
+
+@pytest.fixture(autouse=True)
+def sem_espera(monkeypatch):
+    # Mesma política de novas tentativas, sem os segundos de espera exponencial
+    monkeypatch.setattr(suri_api, "criar_sessao", functools.partial(suri_api.criar_sessao, espera=0.01))
+
+def _sincronizar(conn, servidor, completa=False):
+    return suri_api.sincronizar_contatos(conn, servidor.endpoint, "token", "canal", completa=completa)
+
+def _contar(conn, sql="SELECT COUNT(*) FROM suri"):
+    return conn.execute(sql).fetchone()[0]
+
+def test_sincronizacao_completa_substitui_a_tabela(conn, servidor):
+    conn.execute("CREATE TABLE IF NOT EXISTS suri (suri_id TEXT, Nome TEXT)")
+    conn.execute("INSERT INTO suri (suri_id, Nome) VALUES ('antigo', 'Contato removido da API')")
+    conn.commit()
+
+    resultado = _sincronizar(conn, servidor, completa=True)
+
+    assert resultado == {"modo": "completa", "contatos": TOTAL, "atendentes": True}
+    assert servidor.listagens == 3  # uma requisição por página
+    assert _contar(conn) == TOTAL
+    assert _contar(conn, "SELECT COUNT(*) FROM suri WHERE suri_id = 'antigo'") == 0
+    assert conn.execute("SELECT Ultimo_Atendente, codcli, Nome FROM suri WHERE suri_id = 'c1'").fetchone() == ("Ana", "1", "Cliente 1")
+    assert suri_api.marca_atual(conn) == pd.Timestamp(_atividade(TOTAL - 1))
+
+def test_sincronizacao_incremental_para_na_marca(conn, servidor):
+    _sincronizar(conn, servidor, completa=True)
+    servidor.listagens = 0
+    for i in (3, 7):
+        servidor.contatos[i]["lastActivity"] = "2025-07-01T00:00:00Z"
+
+    resultado = _sincronizar(conn, servidor)
+
+    assert resultado["modo"] == "incremental"
+    # Os dois alterados e o contato que definiu a marca (atividade igual a ela)
+    assert resultado["contatos"] == 3
+    assert servidor.listagens == 1  # a primeira página já alcançou a marca
+    assert suri_api.marca_atual(conn) == pd.Timestamp("2025-07-01T00:00:00Z")
+
+def test_sincronizacao_incremental_atualiza_pelo_suri_id(conn, servidor):
+    _sincronizar(conn, servidor, completa=True)
+    servidor.contatos[5]["lastActivity"] = "2025-07-01T00:00:00Z"
+    servidor.contatos[5]["name"] = "5|Nome Novo"
+    servidor.contatos.append(contato(TOTAL, "2025-07-02T00:00:00Z"))
+
+    _sincronizar(conn, servidor)
+
+    assert _contar(conn) == TOTAL + 1
+    assert _contar(conn, "SELECT COUNT(DISTINCT suri_id) FROM suri") == TOTAL + 1
+    assert conn.execute("SELECT Nome FROM suri WHERE suri_id = 'c5'").fetchall() == [("Nome Novo",)]
+
+def test_sincronizacao_incremental_refaz_o_indice_uma_vez(conn, servidor, monkeypatch):
+    _sincronizar(conn, servidor, completa=True)
+    for i in range(150):  # alterados em duas páginas
+        servidor.contatos[i]["lastActivity"] = "2025-07-01T00:00:00Z"
+    servidor.contatos[140]["name"] = "140|Zuleica"
+    reconstrucoes = []
+    reconstruir = suri_api.reconstruir_indice_busca
+    monkeypatch.setattr(suri_api, "reconstruir_indice_busca", lambda conn, tabelas: reconstrucoes.append(tabelas) or reconstruir(conn, tabelas))
+
+    resultado = _sincronizar(conn, servidor)
+
+    assert servidor.listagens > 3
+    assert resultado["contatos"] > 150
+    assert reconstrucoes == [["suri"]]
+    assert _contar(conn) == TOTAL
+    assert buscar_chaves(conn, "suri", "zuleica") == {"c140"}
+
+def test_sincronizacao_completa_nao_prende_o_banco_durante_as_requisicoes(conn, servidor):
+    escritas = []
+
+    def escrever_em_outra_conexao():
+        # Outra conexão consegue o lock de escrita sem esperar enquanto a página é baixada
+        outra = sqlite3.connect(db.DB_FILE, timeout=0)
+        try:
+            outra.execute("BEGIN IMMEDIATE")
+            outra.rollback()
+            escritas.append(True)
+        except sqlite3.OperationalError:
+            escritas.append(False)
+        finally:
+            outra.close()
+    servidor.ao_listar = escrever_em_outra_conexao
+
+    _sincronizar(conn, servidor, completa=True)
+
+    assert escritas == [True] * 3
+    assert _contar(conn) == TOTAL
+
+def test_sincronizacao_tenta_de_novo_em_429_e_5xx(conn, servidor):
+    servidor.falhas = [429, 503, 502]
+
+    resultado = _sincronizar(conn, servidor, completa=True)
+
+    assert servidor.erros == 3
+    assert resultado["contatos"] == TOTAL
+    assert _contar(conn) == TOTAL
+
+def test_carga_do_arquivo_forca_sincronizacao_completa(conn, servidor):
+    _sincronizar(conn, servidor, completa=True)
+    # Exportação manual: os contatos do arquivo não têm suri_id
+    arquivo = pd.DataFrame({"Numero": ["5511900000001", "5511900000002"], "Nome": ["Cliente 1", "Cliente 2"]})
+
+    gravar_arquivo(conn, "suri.xlsx", arquivo)
+
+    assert suri_api.marca_atual(conn) is None
+    resultado = _sincronizar(conn, servidor)
+    assert resultado["modo"] == "completa"
+    assert _contar(conn) == TOTAL
@@ -0,0 +1,63 @@
+import json
+import subprocess
+import sys
+import tarefas
+
+def _criar_tarefa(conn, tipo, parametros=None):
+    tarefas.criar_tabela_tarefas(conn)
+    cursor = conn.execute(
+        "INSERT INTO tarefas (tipo, parametros, status) VALUES (?, ?, ?)",
+        (tipo, json.dumps(parametros or {}), tarefas.NA_FILA)
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+def _status(conn, id_tarefa):
+    return conn.execute("SELECT status, progresso, erro FROM tarefas WHERE id = ?", (id_tarefa,)).fetchone()
+
+def test_progresso_nao_confirma_a_transacao_da_tarefa(conn, monkeypatch):
+    conn.execute("CREATE TABLE rascunho (valor INTEGER)")
+    conn.commit()
+
+    def tarefa_que_falha(conn, parametros, progresso):
+        progresso("Lendo")
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO rascunho VALUES (1)")
+        progresso("Gravando")  # com o lock da tarefa: descartado, sem confirmar a transação
+        raise ValueError("falha depois do progresso")
+    monkeypatch.setitem(tarefas.TIPOS_TAREFA, "teste", tarefa_que_falha)
+    id_tarefa = _criar_tarefa(conn, "teste")
+
+    tarefas._executar(id_tarefa)  # na thread do teste, com a conexão de escrita dela
+
+    assert _status(conn, id_tarefa) == (tarefas.ERRO, "Lendo", "falha depois do progresso")
+    assert conn.execute("SELECT COUNT(*) FROM rascunho").fetchone()[0] == 0
+
+def test_so_as_tarefas_de_processos_encerrados_sao_interrompidas(conn):
+    vivo = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    encerrado = subprocess.Popen([sys.executable, "-c", "pass"])
+    encerrado.wait()
+    boot = tarefas._id_boot()
+    try:
+        donos = {
+            "outro processo vivo": f"{boot}:{vivo.pid}",
+            "processo encerrado": f"{boot}:{encerrado.pid}",
+            "outro boot": f"boot-anterior:{vivo.pid}",
+            "sem dono": None,
+        }
+        ids = {}
+        for descricao, dono in donos.items():
+            ids[descricao] = _criar_tarefa(conn, "teste")
+            conn.execute("UPDATE tarefas SET dono = ? WHERE id = ?", (dono, ids[descricao]))
+        conn.commit()
+
+        assert tarefas.marcar_interrompidas(conn) == 3
+
+        status = {descricao: _status(conn, id_tarefa)[0] for descricao, id_tarefa in ids.items()}
+        assert status == {
+            "outro processo vivo": tarefas.NA_FILA, "processo encerrado": tarefas.ERRO,
+            "outro boot": tarefas.ERRO, "sem dono": tarefas.ERRO,
+        }
+    finally:
+        vivo.kill()
+        vivo.wait()
@@ -0,0 +1,21 @@
+import os
+import pytest
+import tempo_inicio
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARQUIVOS = tempo_inicio.arquivos_do_app(RAIZ)
+LIMITE_MS = os.environ.get("GESTOR_LIMITE_IMPORTACAO_MS")
+
+@pytest.mark.parametrize("arquivo", ARQUIVOS)
+def test_dependencias_pesadas_so_dentro_das_funcoes(arquivo):
+    inesperados = set(tempo_inicio.pesados_carregados(arquivo, RAIZ)) - set(tempo_inicio.PESADOS_ACEITOS.get(arquivo, ()))
+    assert not inesperados, f"{arquivo} importa {', '.join(sorted(inesperados))} no carregamento"
+
+@pytest.mark.skipif(LIMITE_MS is None, reason="medição de tempo opcional: defina GESTOR_LIMITE_IMPORTACAO_MS")
+@pytest.mark.parametrize("arquivo", ARQUIVOS)
+def test_tempo_de_importacao(arquivo, record_property):
+    total, _, caros = tempo_inicio.medir_arquivo(arquivo, RAIZ, repeticoes=3)
+    # Fica no relatório do pytest (ex.: --junitxml) para acompanhar a evolução
+    record_property("importacao_ms", round(total))
+    record_property("modulos_mais_caros", ", ".join(f"{modulo} {tempo:.0f}ms" for modulo, tempo in caros))
+    assert total <= float(LIMITE_MS), f"{arquivo} levou {total:.0f}ms para importar (limite {float(LIMITE_MS):.0f}ms)"
@@ -0,0 +1,74 @@
+import pandas as pd
+from functools import lru_cache
+from db import conexao_leitura, versao_dados
+from esquema import colunas_da_tabela
+
+# --- CONVERSÃO ENTRE M² E ROLOS ---
+# Regra única para todas as páginas: produtos sem m2 cadastrado (nulo ou zero) valem 0 rolos.
+
+def m2_para_rolos(quantidade_m2, m2_por_rolo):
+    """Converte quantidades em m² para rolos, de forma vetorizada."""
+    quantidade = pd.to_numeric(quantidade_m2, errors='coerce')
+    m2 = pd.to_numeric(m2_por_rolo, errors='coerce')
+    return (quantidade / m2.where(m2 > 0)).fillna(0)
+
+def rolos_para_m2(rolos, m2_por_rolo):
+    """Converte quantidades em rolos para m², de forma vetorizada."""
+    quantidade = pd.to_numeric(rolos, errors='coerce')
+    m2 = pd.to_numeric(m2_por_rolo, errors='coerce')
+    return (quantidade * m2.where(m2 > 0)).fillna(0)
+
+@lru_cache(maxsize=2)
+def _tabela_m2(versao):
+    df = pd.read_sql_query("SELECT codpro, m2 FROM produtos", conexao_leitura())
+    tabela = pd.Series(pd.to_numeric(df['m2'], errors='coerce').values, index=df['codpro'].astype(str))
+    return tabela[~tabela.index.duplicated()]
+
+def tabela_m2():
+    """Série codpro -> m2 por rolo, mantida em memória até a próxima carga de produtos."""
+    return _tabela_m2(versao_dados('produtos'))
+
+def rolos_por_produto(quantidade_m2, codpro):
+    """Converte m² em rolos buscando o m2 de cada produto (Series alinhadas pelo índice)."""
+    return m2_para_rolos(quantidade_m2, codpro.astype(str).map(tabela_m2()))
+
+# --- ROLOS GRAVADOS NAS TABELAS ---
+# As cargas já gravam a quantidade em rolos, para que as páginas não precisem recalculá-la.
+# Para cada tabela: (coluna de quantidade em m², coluna do código do produto, coluna de rolos)
+COLUNAS_ROLOS = {
+    "pedidos": ("Qt_Vend", "Codpro", "Rolos"),
+    "estoque": ("qtde", "codpro", "rolos"),
+}
+
+def atualizar_rolos(conn, tabelas=None):
+    """
+    Recalcula no banco a coluna de rolos das tabelas a partir do m2 atual dos produtos,
+    criando a coluna se ainda não existir. Usada quando o cadastro de produtos muda.
+    """
+    for tabela, (coluna_qtde, coluna_codpro, coluna_rolos) in COLUNAS_ROLOS.items():
+        if tabelas is not None and tabela not in tabelas:
+            continue
+        existentes = colunas_da_tabela(conn, tabela)
+        if not existentes:
+            continue
+        if coluna_rolos not in existentes:
+            conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna_rolos} REAL")
+        conn.execute(f"""
+            UPDATE {tabela}
+            SET {coluna_rolos} = COALESCE((
+                SELECT {tabela}.{coluna_qtde} / p.m2 FROM produtos p
+                WHERE p.codpro = {tabela}.{coluna_codpro} AND p.m2 > 0
+                LIMIT 1
+            ), 0)
+        """)
+    conn.commit()
+
+def migrar_rolos(conn):
+    """Cria e preenche a coluna de rolos nas tabelas que ainda não a possuem."""
+    faltantes = []
+    for tabela, (_, _, coluna_rolos) in COLUNAS_ROLOS.items():
+        existentes = colunas_da_tabela(conn, tabela)
+        if existentes and coluna_rolos not in existentes:
+            faltantes.append(tabela)
+    if faltantes:
+        atualizar_rolos(conn, faltantes)
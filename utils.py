@@ -1,14 +1,28 @@
+import os
 import pandas as pd
 import re
-import phonenumbers
+from functools import lru_cache
 
+# --- PADRONIZAÇÃO DE TELEFONES ---
+
+# DDDs brasileiros em uso; números nesses DDDs com 9 + 8 dígitos (celular) ou
+# [2-5] + 7 dígitos (fixo) são sempre válidos para a biblioteca phonenumbers.
+DDDS_BR = (
+    "1[1-9]|2[12478]|3[1-578]|4[1-9]|5[1345]|6[1-9]|7[13579]|8[1-9]|9[1-9]"
+)
+_PADRAO_NACIONAL_BR = rf"(?:{DDDS_BR})(?:9\d{{8}}|[2-5]\d{{7}})"
+
+@lru_cache(maxsize=100_000)
 def padronizar_telefone(numero):
     """
     Usa a biblioteca phonenumbers para analisar, validar e formatar um número de telefone.
     Retorna uma string de dígitos no formato DDI+DDD+Numero.
+    Para colunas inteiras, prefira padronizar_telefones, que evita a biblioteca nos formatos comuns.
     """
     if not numero or pd.isna(numero):
         return ""
+    # Importada aqui: as metadatas da biblioteca são grandes e só a carga de contatos precisa delas
+    import phonenumbers
     
     try:
         # O 'BR' ajuda a biblioteca a entender números sem código de país (ex: (51) 99141-3631)
@@ -26,10 +40,137 @@ def padronizar_telefone(numero):
         # Se a biblioteca não conseguir nem "ler" o número, retorna apenas os dígitos
         return re.sub(r'\D', '', str(numero))
 
+def _padronizar_formatos_comuns(valores):
+    """
+    Caminho vetorizado para os formatos brasileiros comuns, ex.: (51) 99141-3631,
+    51991413631, +55 51 3333-4444. Retorna o número padronizado ou NaN quando o
+    formato é ambíguo e precisa passar pela biblioteca.
+    """
+    texto = valores.str.strip()
+    digitos = texto.str.replace(r'\D', '', regex=True)
+    # Só dígitos, espaços, parênteses, hífen e um '+' inicial; nada de ramais ou prefixos de operadora
+    formato_simples = texto.str.fullmatch(r'\+?[\d\s()\-]+')
+    com_ddi = digitos.str.len().isin([12, 13]) & digitos.str.startswith('55')
+    nacional = digitos.where(~com_ddi, digitos.str[2:])
+    # Com '+' o número precisa trazer o DDI 55
+    ddi_ok = ~texto.str.startswith('+') | com_ddi
+    valido = formato_simples & ddi_ok & nacional.str.fullmatch(_PADRAO_NACIONAL_BR)
+    return ('55' + nacional).where(valido)
+
+def criar_tabela_telefones(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS telefones_normalizados (bruto TEXT PRIMARY KEY, padronizado TEXT)")
+
+def gravar_telefones_normalizados(conn, novos):
+    """Grava no cache telefones_normalizados os resultados novos (dict bruto -> padronizado)."""
+    if novos:
+        criar_tabela_telefones(conn)
+        conn.executemany("INSERT OR REPLACE INTO telefones_normalizados (bruto, padronizado) VALUES (?, ?)", novos.items())
+        conn.commit()
+
+def padronizar_telefones(valores, conn=None, novos=None):
+    """
+    Versão em lote de padronizar_telefone para uma coluna inteira.
+    Cada valor distinto é processado uma única vez: os formatos comuns são resolvidos
+    de forma vetorizada e apenas os restantes passam pela biblioteca phonenumbers.
+    Com 'conn', os resultados da biblioteca ficam gravados na tabela telefones_normalizados
+    e são reaproveitados nas próximas cargas.
+    Com 'novos' (dict), o cache é apenas consultado ('conn' pode ser somente leitura) e os
+    resultados novos são acrescentados ao dict, para quem lê gravá-los depois.
+    Retorna uma Series alinhada com a entrada.
+    """
+    serie = pd.Series(valores, dtype=object) if not isinstance(valores, pd.Series) else valores
+    vazios = serie.isna() | (serie.astype(str) == '')
+    texto = serie.astype(str).where(~vazios, '')
+
+    unicos = pd.Series(texto[~vazios].unique(), dtype=object)
+    padronizados = pd.Series(_padronizar_formatos_comuns(unicos).values, index=unicos.values, dtype=object)
+
+    pendentes = padronizados.index[padronizados.isna()].tolist()
+    if pendentes:
+        resultados = {}
+        if conn is not None:
+            if novos is None:
+                criar_tabela_telefones(conn)
+            # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+            for i in range(0, len(pendentes), 900):
+                bloco = pendentes[i:i + 900]
+                marcadores = ','.join(['?'] * len(bloco))
+                resultados.update(conn.execute(
+                    f"SELECT bruto, padronizado FROM telefones_normalizados WHERE bruto IN ({marcadores})", bloco
+                ).fetchall())
+        calculados = {bruto: padronizar_telefone(bruto) for bruto in pendentes if bruto not in resultados}
+        if novos is not None:
+            novos.update(calculados)
+        elif conn is not None:
+            gravar_telefones_normalizados(conn, calculados)
+        resultados.update(calculados)
+        padronizados.loc[pendentes] = [resultados[bruto] for bruto in pendentes]
+
+    return texto.map(padronizados).fillna('').astype(object)
+
 def formatar_data(coluna_data):
     """
     Converte uma coluna de data para o formato dd/mm/YYYY,
     forçando a interpretação do dia primeiro.
     """
     datas_convertidas = pd.to_datetime(coluna_data, errors='coerce', dayfirst=True)
-    return datas_convertidas.dt.strftime('%d/%m/%Y')
\ No newline at end of file
+    return datas_convertidas.dt.strftime('%d/%m/%Y')
+
+def chave_data(coluna_data):
+    """
+    Converte uma coluna de datas dd/mm/YYYY na chave inteira YYYYMMDD,
+    que é ordenável e pode ser usada em filtros por intervalo no banco.
+    """
+    datas = pd.to_datetime(coluna_data, format='%d/%m/%Y', errors='coerce')
+    return (datas.dt.year * 10000 + datas.dt.month * 100 + datas.dt.day).astype('Int64')
+
+def intervalos_meses(ano, meses):
+    """
+    Agrupa os meses selecionados de um ano em intervalos contíguos de chaves YYYYMMDD.
+    Ex.: ano 2025, meses [1, 2, 5] -> [(20250101, 20250231), (20250501, 20250531)]
+    """
+    intervalos = []
+    for mes in sorted(set(int(m) for m in meses)):
+        inicio, fim = int(ano) * 10000 + mes * 100 + 1, int(ano) * 10000 + mes * 100 + 31
+        if intervalos and intervalos[-1][1] // 100 == (inicio // 100) - 1:
+            intervalos[-1] = (intervalos[-1][0], fim)
+        else:
+            intervalos.append((inicio, fim))
+    return intervalos
+
+def clausula_periodo(coluna_chave, ano, meses):
+    """
+    Monta a cláusula WHERE de um ano e lista de meses sobre uma coluna de chave YYYYMMDD,
+    usando apenas comparações por intervalo (aproveitam índices).
+    """
+    if not meses: return "1=0"
+    partes = [f"{coluna_chave} BETWEEN {inicio} AND {fim}" for inicio, fim in intervalos_meses(ano, meses)]
+    return "(" + " OR ".join(partes) + ")"
+
+def clausula_anomes(coluna_anomes, ano, meses):
+    """
+    Monta a cláusula WHERE de um ano e lista de meses sobre uma coluna AnoMes (YYYYMM),
+    usada nas tabelas de resumo mensal.
+    """
+    if not meses: return "1=0"
+    return f"{coluna_anomes} IN ({', '.join(str(int(ano) * 100 + int(m)) for m in sorted(set(meses)))})"
+
+# --- PROCESSOS ---
+
+def processo_ativo(pid):
+    """Indica se há um processo rodando com o pid informado nesta máquina."""
+    if os.name == "nt":
+        # No Windows, os.kill encerraria o processo: consulta se ele existe pela API do sistema
+        import ctypes
+        processo = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not processo:
+            return False
+        ctypes.windll.kernel32.CloseHandle(processo)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # existe, de outro usuário
+    return True